@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+import argparse
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from datetime import datetime, timedelta
+from database.connection import DatabaseManager
+from database.analytics import DeliveryReport, GROUP_COLUMNS, OVERFLOW_BUCKET
+from utils.config import Config
+
+
+def _fmt(value, suffix=""):
+    if value is None:
+        return "-"
+    if value == OVERFLOW_BUCKET:
+        return ">1d"
+    return f"{value}{suffix}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Laporan performa pengiriman dari tabel rollup")
+    parser.add_argument("--hours", type=int, default=24, help="rentang laporan (jam terakhir)")
+    parser.add_argument("--by", choices=sorted(GROUP_COLUMNS), default="channel")
+    parser.add_argument("--reasons", type=int, default=10, help="jumlah alasan gagal teratas")
+    args = parser.parse_args()
+
+    config = Config()
+    report = DeliveryReport(DatabaseManager(config.database))
+    until = datetime.now()
+    since = (until - timedelta(hours=args.hours)).replace(minute=0, second=0, microsecond=0)
+
+    print(f"📊 Delivery report {since:%d/%m/%Y %H:%M} - {until:%d/%m/%Y %H:%M} (per {args.by})\n")
+    print(f"{args.by:<20} {'sent':>7} {'failed':>7} {'skipped':>8} {'ok%':>6} {'avg':>7} {'p50':>6} {'p90':>6} {'p99':>6}")
+    for row in report.summary(since, until, args.by):
+        label = row[args.by]
+        if isinstance(label, datetime):
+            label = label.strftime("%d/%m %H:00")
+        print(
+            f"{str(label or '-'):<20} {row['sent']:>7} {row['failed']:>7} {row['skipped']:>8} "
+            f"{_fmt(row['success_rate']):>6} {_fmt(row['avg_latency_seconds'], 's'):>7} "
+            f"{_fmt(row['p50_latency_seconds'], 's'):>6} {_fmt(row['p90_latency_seconds'], 's'):>6} "
+            f"{_fmt(row['p99_latency_seconds'], 's'):>6}"
+        )
+
+    reasons = report.failure_reasons(since, until, args.reasons)
+    if reasons:
+        print("\n❌ Top failure reasons")
+        for row in reasons:
+            print(f"   {row['channel']:<10} {int(row['count']):>6}  {row['reason']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""Stub lokal Telegram Bot API untuk menguji pengiriman & acknowledgement.
+
+Jalankan stub, lalu set ``telegram.api_base: "http://127.0.0.1:8081"`` di
+config. Endpoint yang didukung: getMe, sendMessage, getUpdates (long-poll),
+answerCallbackQuery. Simulasikan dokter lewat:
+
+    # klik tombol "Sudah dibaca" di pesan message_id 1
+    curl -X POST http://127.0.0.1:8081/_ack -d '{"chat_id": 123, "message_id": 1}'
+    # reply ke message_id 1
+    curl -X POST http://127.0.0.1:8081/_reply -d '{"chat_id": 123, "message_id": 1, "text": "ok"}'
+"""
+import argparse
+import itertools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class StubState:
+    def __init__(self):
+        self.lock = threading.Condition()
+        self.updates = []
+        self.update_ids = itertools.count(1)
+        self.message_ids = itertools.count(1)
+        self.sent = []
+
+    def push_update(self, update: dict):
+        with self.lock:
+            update["update_id"] = next(self.update_ids)
+            self.updates.append(update)
+            self.lock.notify_all()
+
+    def get_updates(self, offset: int | None, timeout: float, limit: int) -> list:
+        deadline = time.time() + timeout
+        with self.lock:
+            if offset is not None:
+                # Sama seperti Telegram: offset mengonfirmasi update sebelumnya
+                self.updates = [u for u in self.updates if u["update_id"] >= offset]
+            while not self.updates and time.time() < deadline:
+                self.lock.wait(deadline - time.time())
+            return self.updates[:limit]
+
+
+def make_handler(state: StubState):
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, body: dict, code: int = 200):
+            payload = json.dumps(body).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def _body(self) -> dict:
+            length = int(self.headers.get("Content-Length") or 0)
+            return json.loads(self.rfile.read(length) or b"{}")
+
+        def _method(self) -> str:
+            return urlparse(self.path).path.rsplit("/", 1)[-1]
+
+        def do_GET(self):
+            method = self._method()
+            query = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+            if method == "getMe":
+                self._reply({"ok": True, "result": {"id": 1, "is_bot": True, "username": "stub_bot"}})
+            elif method == "getUpdates":
+                offset = int(query["offset"]) if "offset" in query else None
+                updates = state.get_updates(
+                    offset, float(query.get("timeout", 0)), int(query.get("limit", 100))
+                )
+                self._reply({"ok": True, "result": updates})
+            else:
+                self._reply({"ok": False, "description": "Not Found"}, 404)
+
+        def do_POST(self):
+            method = self._method()
+            body = self._body()
+            now = int(time.time())
+            if method == "sendMessage":
+                message = {
+                    "message_id": next(state.message_ids),
+                    "chat": {"id": body.get("chat_id")},
+                    "date": now,
+                    "text": body.get("text"),
+                    "reply_markup": body.get("reply_markup"),
+                }
+                state.sent.append(message)
+                print(f"📤 sendMessage chat={message['chat']['id']} message_id={message['message_id']}")
+                self._reply({"ok": True, "result": message})
+            elif method == "answerCallbackQuery":
+                self._reply({"ok": True, "result": True})
+            elif method == "_ack":
+                # Seperti Telegram: callback membawa pesan yang tombolnya diklik
+                sent = next(
+                    (m for m in state.sent
+                     if m["message_id"] == body.get("message_id")
+                     and str(m["chat"]["id"]) == str(body.get("chat_id"))),
+                    None,
+                )
+                if sent is None or not sent.get("reply_markup"):
+                    self._reply({"ok": False, "description": "message has no ack button"}, 400)
+                    return
+                button = sent["reply_markup"]["inline_keyboard"][0][0]
+                state.push_update({"callback_query": {
+                    "id": str(now),
+                    "from": {"id": body.get("chat_id"), "username": body.get("username", "dokter")},
+                    "message": sent,
+                    "data": body.get("data", button["callback_data"]),
+                }})
+                self._reply({"ok": True})
+            elif method == "_reply":
+                state.push_update({"message": {
+                    "message_id": next(state.message_ids),
+                    "chat": {"id": body.get("chat_id")},
+                    "from": {"id": body.get("chat_id"), "username": body.get("username", "dokter")},
+                    "date": now,
+                    "text": body.get("text", "ok"),
+                    "reply_to_message": {"message_id": body["message_id"]},
+                }})
+                self._reply({"ok": True})
+            else:
+                self._reply({"ok": False, "description": "Not Found"}, 404)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub lokal Telegram Bot API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(StubState()))
+    server.daemon_threads = True
+    print(f"🤖 Telegram stub listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n🛑 Stub stopped")
+
+
+if __name__ == "__main__":
+    main()
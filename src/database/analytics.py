@@ -0,0 +1,235 @@
+import logging
+import re
+import threading
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Dict, List
+
+from utils.tracing import get_tracer
+
+# Batas atas bucket histogram latency enqueue -> sent (detik)
+LATENCY_BUCKETS = (1, 2, 5, 10, 30, 60, 120, 300, 600, 1800, 3600, 7200, 21600, 86400)
+OVERFLOW_BUCKET = 2147483647
+
+GROUP_COLUMNS = {
+    "hour": "bucket_hour",
+    "channel": "channel",
+    "ward": "kd_bangsal",
+    "doctor": "kd_dokter",
+}
+
+
+def _latency_bucket(seconds: float) -> int:
+    for bound in LATENCY_BUCKETS:
+        if seconds <= bound:
+            return bound
+    return OVERFLOW_BUCKET
+
+
+def normalize_reason(reason: str) -> str:
+    """Buang detail per penerima (nomor, body response) supaya reason bisa di-rollup"""
+    return re.split(r"[:']", reason, maxsplit=1)[0].strip()[:191] or "unknown"
+
+
+def percentile_from_histogram(histogram: Dict[int, int], percentile: float) -> int | None:
+    """Estimasi persentil = batas atas bucket tempat persentil tersebut jatuh"""
+    total = sum(histogram.values())
+    if not total:
+        return None
+    threshold = total * percentile / 100
+    running = 0
+    for bound in sorted(histogram):
+        running += histogram[bound]
+        if running >= threshold:
+            return bound
+    return OVERFLOW_BUCKET
+
+
+class DeliveryRollup:
+    """Rollup analitik pengiriman yang diperbarui inkremental oleh monitor.
+
+    Setiap hasil kirim (per pesan penerima per channel) diakumulasi di memori
+    dengan key (jam, channel, bangsal, dokter), lalu di-flush setiap tick
+    sebagai ``INSERT ... ON DUPLICATE KEY UPDATE`` ke tiga tabel rollup:
+    jumlah sent/failed/skipped, histogram latency enqueue -> sent, dan
+    alasan gagal. Flush yang gagal disimpan untuk dicoba lagi tick berikutnya.
+    """
+
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._counts = defaultdict(lambda: [0, 0, 0, 0.0])
+        self._latency = Counter()
+        self._reasons = Counter()
+
+    # ---------------------------------------------------------- #
+    def record(self, message: dict, channel: str, status: str, reason: str | None = None):
+        """``status``: ``sent``, ``failed`` atau ``skipped`` (kontak tidak tersedia)"""
+        now = datetime.now()
+        key = (
+            now.replace(minute=0, second=0, microsecond=0),
+            channel,
+            message.get("kd_bangsal") or "",
+            message.get("kd_dokter") or "",
+        )
+        with self._lock:
+            counts = self._counts[key]
+            if status == "sent":
+                counts[0] += 1
+                enqueued_at = message.get("notification_time")
+                if isinstance(enqueued_at, datetime):
+                    latency = max(0.0, (now - enqueued_at).total_seconds())
+                    counts[3] += latency
+                    self._latency[key + (_latency_bucket(latency),)] += 1
+            else:
+                counts[1 if status == "failed" else 2] += 1
+                self._reasons[key + (normalize_reason(reason or status),)] += 1
+
+    @property
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._counts)
+
+    def flush(self) -> bool:
+        """Tulis akumulasi ke tabel rollup dalam satu transaksi"""
+        with self._lock:
+            counts, latency, reasons = self._counts, self._latency, self._reasons
+            self._reset()
+        if not counts:
+            return True
+
+        try:
+            with get_tracer().span("db.flush_delivery_rollup", keys=len(counts)), \
+                    self.db_manager.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.executemany(
+                    """
+                    INSERT INTO notification_delivery_rollup
+                        (bucket_hour, channel, kd_bangsal, kd_dokter,
+                         sent_count, failed_count, skipped_count, latency_sum_seconds)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                    ON DUPLICATE KEY UPDATE
+                        sent_count = sent_count + VALUES(sent_count),
+                        failed_count = failed_count + VALUES(failed_count),
+                        skipped_count = skipped_count + VALUES(skipped_count),
+                        latency_sum_seconds = latency_sum_seconds + VALUES(latency_sum_seconds)
+                    """,
+                    [key + tuple(values) for key, values in counts.items()],
+                )
+                if latency:
+                    cursor.executemany(
+                        """
+                        INSERT INTO notification_latency_rollup
+                            (bucket_hour, channel, kd_bangsal, kd_dokter, le_seconds, count)
+                        VALUES (%s, %s, %s, %s, %s, %s)
+                        ON DUPLICATE KEY UPDATE count = count + VALUES(count)
+                        """,
+                        [key + (count,) for key, count in latency.items()],
+                    )
+                if reasons:
+                    cursor.executemany(
+                        """
+                        INSERT INTO notification_failure_rollup
+                            (bucket_hour, channel, kd_bangsal, kd_dokter, reason, count)
+                        VALUES (%s, %s, %s, %s, %s, %s)
+                        ON DUPLICATE KEY UPDATE count = count + VALUES(count)
+                        """,
+                        [key + (count,) for key, count in reasons.items()],
+                    )
+                conn.commit()
+                cursor.close()
+            return True
+        except Exception as e:
+            self.logger.error("❌ Error flushing delivery rollup: %s", e)
+            self._merge(counts, latency, reasons)
+            return False
+
+    def _merge(self, counts, latency, reasons):
+        """Kembalikan akumulasi yang gagal di-flush supaya tidak hilang"""
+        with self._lock:
+            for key, values in counts.items():
+                current = self._counts[key]
+                for index, value in enumerate(values):
+                    current[index] += value
+            self._latency.update(latency)
+            self._reasons.update(reasons)
+
+
+class DeliveryReport:
+    """Laporan performa pengiriman yang dibaca dari tabel rollup saja"""
+
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+        self.logger = logging.getLogger(__name__)
+
+    def _query(self, query: str, params) -> List[Dict]:
+        with self.db_manager.get_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute(query, params)
+            rows = cursor.fetchall()
+            cursor.close()
+        return rows
+
+    def summary(self, since: datetime, until: datetime, group_by: str = "channel") -> List[Dict]:
+        """Jumlah, success rate, rata-rata & persentil latency per grup"""
+        column = GROUP_COLUMNS[group_by]
+        rows = self._query(
+            f"""
+            SELECT {column} AS grp,
+                   SUM(sent_count) AS sent,
+                   SUM(failed_count) AS failed,
+                   SUM(skipped_count) AS skipped,
+                   SUM(latency_sum_seconds) AS latency_sum
+            FROM notification_delivery_rollup
+            WHERE bucket_hour >= %s AND bucket_hour < %s
+            GROUP BY grp
+            ORDER BY grp
+            """,
+            (since, until),
+        )
+        histograms = defaultdict(dict)
+        for row in self._query(
+            f"""
+            SELECT {column} AS grp, le_seconds, SUM(count) AS count
+            FROM notification_latency_rollup
+            WHERE bucket_hour >= %s AND bucket_hour < %s
+            GROUP BY grp, le_seconds
+            """,
+            (since, until),
+        ):
+            histograms[row["grp"]][row["le_seconds"]] = int(row["count"])
+
+        report = []
+        for row in rows:
+            sent, failed = int(row["sent"] or 0), int(row["failed"] or 0)
+            histogram = histograms.get(row["grp"], {})
+            report.append({
+                group_by: row["grp"],
+                "sent": sent,
+                "failed": failed,
+                "skipped": int(row["skipped"] or 0),
+                "success_rate": round(100 * sent / (sent + failed), 1) if sent + failed else None,
+                "avg_latency_seconds": round(float(row["latency_sum"]) / sent, 1) if sent else None,
+                "p50_latency_seconds": percentile_from_histogram(histogram, 50),
+                "p90_latency_seconds": percentile_from_histogram(histogram, 90),
+                "p99_latency_seconds": percentile_from_histogram(histogram, 99),
+            })
+        return report
+
+    def failure_reasons(self, since: datetime, until: datetime, limit: int = 20) -> List[Dict]:
+        """Alasan gagal / skip terbanyak per channel"""
+        return self._query(
+            """
+            SELECT channel, reason, SUM(count) AS count
+            FROM notification_failure_rollup
+            WHERE bucket_hour >= %s AND bucket_hour < %s
+            GROUP BY channel, reason
+            ORDER BY count DESC
+            LIMIT %s
+            """,
+            (since, until, limit),
+        )
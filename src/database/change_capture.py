@@ -0,0 +1,262 @@
+import copy
+import json
+import logging
+import os
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+try:
+    import pymysql
+    from pymysqlreplication import BinLogStreamReader
+    from pymysqlreplication.row_event import WriteRowsEvent
+except ImportError:  # mode binlog opsional
+    pymysql = None
+    BinLogStreamReader = None
+    WriteRowsEvent = None
+
+DEFAULT_STATE_PATH = Path(__file__).parent.parent.parent / 'logs' / 'change_capture_state.json'
+
+
+class InpatientChangeCapture:
+    """Change capture inkremental untuk kamar_inap (pengganti trigger + queue).
+
+    Watermark komposit ``(tgl_masuk, no_rawat)`` disimpan di file state,
+    sehingga tiap tick hanya membaca row setelah watermark. Row yang masuk
+    terlambat dengan ``tgl_masuk`` lebih lama tetap tertangkap lewat jendela
+    ``lookback_seconds``; duplikat dalam jendela itu disaring dengan set key
+    ``no_rawat|kd_dokter`` yang sudah pernah dikirim (pindah kamar tidak
+    dianggap pasien baru).
+
+    Pasien yang belum punya DPJP disimpan di ``awaiting`` dan dicek ulang
+    tiap tick sampai DPJP diisi (maksimal ``dpjp_wait_seconds``).
+
+    ``poll()`` tidak mengubah state tersimpan: panggil ``commit()`` setelah
+    row berhasil masuk queue. Tanpa commit, tick berikutnya membaca ulang
+    dari posisi yang sama (at-least-once).
+    """
+
+    def __init__(self, patient_queries, config: dict, db_config: dict | None = None):
+        self.logger = logging.getLogger(__name__)
+        self.patient_queries = patient_queries
+        self.mode = config.get("mode", "poll")
+        self.batch_size = config.get("batch_size", 500)
+        self.max_pages = config.get("max_pages", 20)
+        self.lookback = timedelta(seconds=config.get("lookback_seconds", 300))
+        self.dpjp_wait = timedelta(seconds=config.get("dpjp_wait_seconds", 3 * 86400))
+        self.state_path = Path(config.get("state_file") or DEFAULT_STATE_PATH)
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        self._pending = None
+        self._load_state()
+
+        self.binlog = None
+        if self.mode == "binlog":
+            self.binlog = BinlogInpatientReader(db_config or {}, config)
+
+    # ---------------------------------------------------------- #
+    # STATE #
+    # ---------------------------------------------------------- #
+    def _load_state(self):
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                self._state = json.load(f)
+        except FileNotFoundError:
+            # Run pertama: mulai dari sekarang, jangan kirim ulang histori
+            self._state = {"tgl_masuk": datetime.now().isoformat(), "no_rawat": ""}
+            self.logger.info("ℹ️ No change capture state, starting from now")
+        self._state.setdefault("seen", {})
+        self._state.setdefault("awaiting", {})
+
+    def _save_state(self):
+        tmp_path = self.state_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.state_path)
+
+    def commit(self):
+        """Simpan watermark, seen, awaiting & posisi binlog dari poll terakhir"""
+        if self._pending is None:
+            return
+        self._state, self._pending = self._pending, None
+        self._save_state()
+
+    @staticmethod
+    def _row_key(row: dict) -> str:
+        return f"{row['no_rawat']}|{row['kd_dokter']}"
+
+    # ---------------------------------------------------------- #
+    # POLLING #
+    # ---------------------------------------------------------- #
+    def poll(self) -> List[Dict] | None:
+        """Ambil row baru sejak watermark; kerja O(row baru + jendela lookback).
+
+        Mengembalikan None bila query gagal (state tidak berubah).
+        """
+        state = copy.deepcopy(self._state)
+        watermark = (datetime.fromisoformat(state["tgl_masuk"]), state["no_rawat"])
+        awaiting: Dict[str, str] = state["awaiting"]
+
+        if self.binlog is not None:
+            result = self.binlog.read_new_no_rawat(state.get("binlog", {}))
+            if result is None:
+                return None
+            no_rawat_list, state["binlog"] = result
+            rows = self.patient_queries.get_inpatients_by_no_rawat(
+                list(dict.fromkeys(no_rawat_list + list(awaiting)))
+            )
+        else:
+            rows = self._scan_from_watermark(watermark)
+            if rows is not None and awaiting:
+                rechecked = self.patient_queries.get_inpatients_by_no_rawat(list(awaiting))
+                rows = None if rechecked is None else rows + rechecked
+        if rows is None:
+            return None
+
+        now = datetime.now()
+        seen: Dict[str, str] = state["seen"]
+        new_rows = []
+        for row in rows:
+            position = (row["tgl_masuk"], row["no_rawat"])
+            if position > watermark:
+                watermark = position
+            if row.get("kd_dokter") is None:
+                # DPJP belum diisi: tunggu, jangan sampai terlewat watermark
+                awaiting.setdefault(row["no_rawat"], now.isoformat())
+                continue
+            awaiting.pop(row["no_rawat"], None)
+            key = self._row_key(row)
+            if key in seen:
+                continue
+            seen[key] = row["tgl_masuk"].isoformat()
+            new_rows.append(row)
+
+        for no_rawat, since in list(awaiting.items()):
+            if now - datetime.fromisoformat(since) > self.dpjp_wait:
+                self.logger.warning("⚠️ No DPJP assigned for %s since %s, giving up", no_rawat, since)
+                del awaiting[no_rawat]
+
+        state["tgl_masuk"], state["no_rawat"] = watermark[0].isoformat(), watermark[1]
+        self._prune_seen(seen, watermark)
+        self._pending = state
+        if new_rows:
+            self.logger.info("🆕 Change capture found %s new inpatient rows", len(new_rows))
+        return new_rows
+
+    def _scan_from_watermark(self, watermark) -> List[Dict] | None:
+        cursor_ts, cursor_key = watermark
+        if self.lookback:
+            cursor_ts, cursor_key = cursor_ts - self.lookback, ""
+
+        rows = []
+        for _ in range(self.max_pages):
+            page = self.patient_queries.get_inpatients_after(cursor_ts, cursor_key, self.batch_size)
+            if page is None:
+                return None
+            if not page:
+                break
+            rows.extend(page)
+            cursor_ts, cursor_key = page[-1]["tgl_masuk"], page[-1]["no_rawat"]
+            # LIMIT berlaku di kamar_inap, bukan hasil join
+            if len({(r["tgl_masuk"], r["no_rawat"]) for r in page}) < self.batch_size:
+                break
+        return rows
+
+    def _prune_seen(self, seen: Dict[str, str], watermark):
+        horizon = (watermark[0] - self.lookback).isoformat()
+        for key in [k for k, ts in seen.items() if ts < horizon]:
+            del seen[key]
+
+
+class BinlogInpatientReader:
+    """Tail binlog MySQL untuk INSERT ke kamar_inap dan dpjp_ranap.
+
+    Posisi ``log_file``/``log_pos`` dikembalikan ke change capture dan baru
+    disimpan saat ``commit()``, jadi setelah restart pembacaan dilanjutkan
+    (replay) dari posisi terakhir yang sudah masuk queue.
+    Membutuhkan paket ``mysql-replication`` dan ``binlog_format=ROW``.
+    """
+
+    def __init__(self, db_config: dict, config: dict):
+        if BinLogStreamReader is None:
+            raise ImportError("mysql-replication is required for change_capture.mode=binlog")
+        self.logger = logging.getLogger(__name__)
+        self.schema = db_config.get("database")
+        self.connection_settings = {
+            "host": db_config.get("host", "localhost"),
+            "port": int(db_config.get("port", 3306)),
+            "user": db_config.get("user"),
+            "passwd": db_config.get("password", ""),
+        }
+        self.server_id = config.get("server_id", 4379)
+        self.max_events = config.get("max_events", 5000)
+
+    def _current_position(self) -> dict | None:
+        """Posisi binlog saat ini (``SHOW MASTER STATUS``), None bila gagal"""
+        try:
+            settings = self.connection_settings
+            conn = pymysql.connect(
+                host=settings["host"], port=settings["port"],
+                user=settings["user"], password=settings["passwd"],
+            )
+            try:
+                with conn.cursor() as cursor:
+                    try:
+                        cursor.execute("SHOW MASTER STATUS")
+                    except pymysql.err.MySQLError:
+                        # MySQL 8.4+: SHOW MASTER STATUS sudah dihapus
+                        cursor.execute("SHOW BINARY LOG STATUS")
+                    row = cursor.fetchone()
+            finally:
+                conn.close()
+        except Exception as e:
+            self.logger.error("❌ Error reading binlog position: %s", e)
+            return None
+        if not row:
+            self.logger.error("❌ Binary logging is not enabled on the server")
+            return None
+        return {"log_file": row[0], "log_pos": int(row[1])}
+
+    def read_new_no_rawat(self, position: dict) -> Tuple[List[str], dict] | None:
+        """no_rawat dari event baru + posisi binlog sesudahnya, None bila gagal"""
+        if not position.get("log_file"):
+            # Run pertama: mulai dari posisi sekarang, sama seperti mode poll.
+            # Tanpa posisi, reader membaca dari awal file binlog saat ini.
+            position = self._current_position()
+            if position is None:
+                return None
+            self.logger.info(
+                "ℹ️ No binlog position, starting from %s:%s", position["log_file"], position["log_pos"]
+            )
+            return [], position
+
+        stream = BinLogStreamReader(
+            connection_settings=self.connection_settings,
+            server_id=self.server_id,
+            only_events=[WriteRowsEvent],
+            only_schemas=[self.schema] if self.schema else None,
+            # DPJP bisa diisi belakangan, jadi insert dpjp_ranap juga dipantau
+            only_tables=["kamar_inap", "dpjp_ranap"],
+            resume_stream=True,
+            log_file=position.get("log_file"),
+            log_pos=position.get("log_pos"),
+            blocking=False,
+        )
+        no_rawat = []
+        try:
+            for count, event in enumerate(stream):
+                for row in event.rows:
+                    value = row["values"].get("no_rawat")
+                    if value and value not in no_rawat:
+                        no_rawat.append(value)
+                if count + 1 >= self.max_events:
+                    break
+            if stream.log_file:
+                position = {"log_file": stream.log_file, "log_pos": stream.log_pos}
+        except Exception as e:
+            self.logger.error("❌ Error reading binlog: %s", e)
+            return None
+        finally:
+            stream.close()
+        return no_rawat, position
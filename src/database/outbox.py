@@ -0,0 +1,168 @@
+import json
+import logging
+import sqlite3
+import threading
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+DEFAULT_OUTBOX_PATH = Path(__file__).parent.parent.parent / 'logs' / 'outbox.sqlite3'
+
+
+def encode_json_value(value):
+    """``json.dumps(default=...)`` yang mempertahankan datetime/date"""
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    if isinstance(value, date):
+        return {"__date__": value.isoformat()}
+    return str(value)
+
+
+def decode_json_value(obj: dict):
+    """Pasangan ``object_hook`` untuk encode_json_value"""
+    if "__datetime__" in obj:
+        return datetime.fromisoformat(obj["__datetime__"])
+    if "__date__" in obj:
+        return date.fromisoformat(obj["__date__"])
+    return obj
+
+
+class StatusOutbox:
+    """Store-and-forward lokal (SQLite) untuk saat MySQL tidak bisa diakses.
+
+    - ``status_outbox``: update status yang gagal ditulis ke MySQL, di-drain
+      bulk sesuai urutan ``seq`` begitu pool tersambung kembali.
+    - ``batch_snapshot``: salinan row prefetch yang sudah di-fan-out tapi belum
+      dikirim (read-through), supaya pengiriman bisa lanjut selama outage.
+    """
+
+    def __init__(self, path=None):
+        self.logger = logging.getLogger(__name__)
+        self.path = Path(path) if path else DEFAULT_OUTBOX_PATH
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS status_outbox (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                notification_id INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                error_message TEXT NULL,
+                created_at TEXT DEFAULT CURRENT_TIMESTAMP
+            );
+            CREATE INDEX IF NOT EXISTS idx_outbox_notification
+                ON status_outbox (notification_id);
+            CREATE TABLE IF NOT EXISTS batch_snapshot (
+                position INTEGER PRIMARY KEY,
+                notification_id INTEGER NOT NULL,
+                payload TEXT NOT NULL
+            );
+            """
+        )
+        self._conn.commit()
+
+    # ---------------------------------------------------------- #
+    # STATUS OUTBOX #
+    # ---------------------------------------------------------- #
+    def enqueue(self, updates: List[Tuple[int, str, str | None]]):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO status_outbox (notification_id, status, error_message) VALUES (?, ?, ?)",
+                updates,
+            )
+            self._conn.commit()
+        self.logger.warning("⚠️ Buffered %s status updates in local outbox", len(updates))
+
+    def size(self) -> int:
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM status_outbox").fetchone()
+        return count
+
+    def has_outcome(self, notification_id: int) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM status_outbox WHERE notification_id = ? LIMIT 1",
+                (notification_id,),
+            ).fetchone()
+        return row is not None
+
+    def drain(self, patient_queries, chunk_size: int = 500) -> bool:
+        """Tulis isi outbox ke MySQL sesuai urutan; False jika DB masih down"""
+        drained = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT seq, notification_id, status, error_message FROM status_outbox "
+                    "ORDER BY seq LIMIT ?",
+                    (chunk_size,),
+                ).fetchall()
+            if not rows:
+                break
+            if not patient_queries.update_notification_statuses([r[1:] for r in rows]):
+                return False
+            with self._lock:
+                self._conn.execute("DELETE FROM status_outbox WHERE seq <= ?", (rows[-1][0],))
+                self._conn.commit()
+            drained += len(rows)
+        if drained:
+            self.logger.info("✅ Drained %s buffered status updates to MySQL", drained)
+        return True
+
+    # ---------------------------------------------------------- #
+    # BATCH SNAPSHOT #
+    # ---------------------------------------------------------- #
+    def save_snapshot(self, batch: List[Tuple[Dict, List[Dict]]]):
+        with self._lock:
+            self._conn.execute("DELETE FROM batch_snapshot")
+            self._conn.executemany(
+                "INSERT INTO batch_snapshot (position, notification_id, payload) VALUES (?, ?, ?)",
+                [
+                    (
+                        position,
+                        notif["notification_id"],
+                        json.dumps({"notif": notif, "messages": messages}, default=encode_json_value),
+                    )
+                    for position, (notif, messages) in enumerate(batch)
+                ],
+            )
+            self._conn.commit()
+
+    def load_snapshot(self) -> List[Tuple[Dict, List[Dict]]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT payload FROM batch_snapshot ORDER BY position"
+            ).fetchall()
+        batch = []
+        for (payload,) in rows:
+            item = json.loads(payload, object_hook=decode_json_value)
+            batch.append((item["notif"], item["messages"]))
+        return batch
+
+    def take_snapshot(self, limit: int, has_outcome) -> List[Tuple[Dict, List[Dict]]]:
+        """Ambil maksimal ``limit`` row snapshot yang belum punya outcome.
+
+        Row yang diambil (dan yang sudah punya outcome) langsung dihapus dari
+        snapshot: begitu outcome-nya di-commit dan journal di-compact, tidak ada
+        lagi yang menyaringnya dan outage berikutnya akan mengirimnya ulang.
+        """
+        batch, done = [], []
+        for notif, messages in self.load_snapshot():
+            if has_outcome(notif["notification_id"]):
+                done.append(notif["notification_id"])
+            elif len(batch) < limit:
+                batch.append((notif, messages))
+                done.append(notif["notification_id"])
+        with self._lock:
+            self._conn.executemany(
+                "DELETE FROM batch_snapshot WHERE notification_id = ?",
+                [(notif_id,) for notif_id in done],
+            )
+            self._conn.commit()
+        return batch
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
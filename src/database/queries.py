@@ -1,18 +1,69 @@
 from datetime import datetime
-from typing import List, Dict
+from typing import List, Dict, Tuple
 import logging
 
+from utils.tracing import get_tracer
+
+# Ekspresi SQL untuk kunci shard (multi-worker mode)
+SHARD_KEYS = {
+    "no_rawat": "nq.no_rawat",
+    "kd_bangsal": "kr.kd_bangsal",
+    # DPJP utama (kd_dokter terkecil) supaya semua row satu dokter di worker yang sama;
+    # row tanpa DPJP jatuh ke no_rawat supaya tetap dipegang salah satu worker
+    "kd_dokter": (
+        "COALESCE((SELECT MIN(dr.kd_dokter) FROM dpjp_ranap dr WHERE dr.no_rawat = nq.no_rawat),"
+        " nq.no_rawat)"
+    ),
+}
+
+# Hanya kamar_inap terakhir per no_rawat, supaya pindah kamar tidak menggandakan
+# row queue (dan kd_bangsal satu row tidak jatuh ke dua shard)
+CURRENT_KAMAR_INAP_JOIN = """
+        JOIN kamar_inap ki ON ki.no_rawat = nq.no_rawat
+            AND (ki.tgl_masuk, ki.kd_kamar) = (
+                SELECT k2.tgl_masuk, k2.kd_kamar FROM kamar_inap k2
+                WHERE k2.no_rawat = nq.no_rawat
+                ORDER BY k2.tgl_masuk DESC, k2.kd_kamar DESC
+                LIMIT 1
+            )"""
+
+# Join tambahan yang dibutuhkan kunci shard di query yang hanya membaca notification_queue
+SHARD_JOINS = {
+    "kd_bangsal": CURRENT_KAMAR_INAP_JOIN + """
+        JOIN kamar kr ON ki.kd_kamar = kr.kd_kamar""",
+}
+
+
 class PatientQueries:
-    def __init__(self, db_manager):
+    def __init__(self, db_manager, shard: tuple | None = None):
+        """``shard`` = (key, index, count); None berarti proses memegang semua row."""
         self.db_manager = db_manager
         self.logger = logging.getLogger(__name__)
+        self.shard = shard
+        if shard is not None and shard[0] not in SHARD_KEYS:
+            raise ValueError(f"Unknown shard key: {shard[0]}")
+
+    def _shard_filter(self) -> Tuple[str, List]:
+        """Klausa ``AND MOD(CRC32(key), count) = index`` + parameternya"""
+        if self.shard is None:
+            return "", []
+        key, index, count = self.shard
+        return f"AND MOD(CRC32({SHARD_KEYS[key]}), %s) = %s", [count, index]
+
+    def _shard_joins(self) -> str:
+        return SHARD_JOINS.get(self.shard[0], "") if self.shard is not None else ""
 
     # ----------------------------------------------------------- #
     # PENDING NOTIFICATIONS #
     # ----------------------------------------------------------- #
 
-    def get_pending_notifications(self) -> List[Dict]:
-        """Ambil notifikasi (status=pending) + info kamar & bangsal + WhatsApp."""
+    def get_pending_notifications(self, limit: int = 10) -> List[Dict] | None:
+        """Ambil notifikasi (status=pending) + info kamar & bangsal.
+
+        Satu row per queue row; penerima (DPJP) di-resolve terpisah lewat
+        get_dpjp_recipients supaya join dpjp_ranap tidak menggandakan row.
+        Mengembalikan None (bukan []) jika database tidak bisa diakses.
+        """
         query = """
         SELECT 
             nq.id AS notification_id,
@@ -30,42 +81,147 @@ class PatientQueries:
                 WHEN p.jk = 'L' THEN 'Laki-laki'
                 WHEN p.jk = 'P' THEN 'Perempuan'
                 ELSE 'Tidak Diketahui'
-            END AS jenis_kelamin,
-            d.nm_dokter,
-            d.telegram_id,
-            d.no_telp AS whatsapp_number  -- TAMBAHAN UNTUK WHATSAPP
+            END AS jenis_kelamin
         FROM notification_queue nq
-        JOIN kamar_inap ki ON nq.no_rawat = ki.no_rawat
-        JOIN kamar kr ON ki.kd_kamar = kr.kd_kamar  
+        {kamar_inap_join}
+        JOIN kamar kr ON ki.kd_kamar = kr.kd_kamar
         JOIN bangsal b ON kr.kd_bangsal = b.kd_bangsal
         JOIN reg_periksa rp ON ki.no_rawat = rp.no_rawat
         JOIN pasien p ON rp.no_rkm_medis = p.no_rkm_medis
-        JOIN dpjp_ranap dr ON ki.no_rawat = dr.no_rawat
-        JOIN dokter d ON dr.kd_dokter = d.kd_dokter
         WHERE nq.status = 'pending'
-        ORDER BY nq.created_at ASC
-        LIMIT 10
+        {shard_filter}
+        ORDER BY nq.created_at ASC, nq.id ASC
+        LIMIT %s
         """
+        shard_filter, params = self._shard_filter()
+        query = query.format(kamar_inap_join=CURRENT_KAMAR_INAP_JOIN, shard_filter=shard_filter)
         
         try:
-            with self.db_manager.get_connection() as conn:
+            with get_tracer().span("db.get_pending_notifications", limit=limit) as span, \
+                    self.db_manager.get_connection() as conn:
                 cursor = conn.cursor(dictionary=True)
-                cursor.execute(query)
+                cursor.execute(query, (*params, limit))
                 notifications = cursor.fetchall()
                 cursor.close()
+                span.set_attribute("rows", len(notifications))
                 self.logger.info("📊 Found %s pending notifications", len(notifications))
                 return notifications
         except Exception as e:
             self.logger.error("❌ Error fetching notifications: %s", e)
-            return []
+            return None
+
+    # ----------------------------------------------------------- #
+    def count_pending_notifications(self) -> int | None:
+        """Kedalaman queue shard ini (COUNT via idx_status); None jika query gagal."""
+        shard_filter, params = self._shard_filter()
+        try:
+            with get_tracer().span("db.count_pending_notifications"), \
+                    self.db_manager.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    f"""
+                    SELECT COUNT(DISTINCT nq.id)
+                    FROM notification_queue nq {self._shard_joins()}
+                    WHERE nq.status = 'pending'
+                    {shard_filter}
+                    """,
+                    params,
+                )
+                (depth,) = cursor.fetchone()
+                cursor.close()
+                return depth
+        except Exception as e:
+            self.logger.error("❌ Error counting pending notifications: %s", e)
+            return None
+
+    def get_queue_lag_seconds(self) -> int | None:
+        """Umur (detik) notifikasi pending tertua di shard ini; 0 jika queue kosong."""
+        shard_filter, params = self._shard_filter()
+        try:
+            with get_tracer().span("db.get_queue_lag_seconds"), \
+                    self.db_manager.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    f"""
+                    SELECT TIMESTAMPDIFF(SECOND, MIN(nq.created_at), NOW())
+                    FROM notification_queue nq {self._shard_joins()}
+                    WHERE nq.status = 'pending'
+                    {shard_filter}
+                    """,
+                    params,
+                )
+                (lag,) = cursor.fetchone()
+                cursor.close()
+                return lag or 0
+        except Exception as e:
+            self.logger.error("❌ Error fetching queue lag: %s", e)
+            return None
+
+    # ----------------------------------------------------------- #
+    def get_dpjp_recipients(self, no_rawat_list: List[str]) -> Dict[str, List[Dict]] | None:
+        """Semua DPJP (+ kontak Telegram/WhatsApp) per no_rawat; None jika query gagal."""
+        if not no_rawat_list:
+            return {}
+        placeholders = ", ".join(["%s"] * len(no_rawat_list))
+        query = f"""
+        SELECT 
+            dr.no_rawat,
+            d.kd_dokter,
+            d.nm_dokter,
+            d.telegram_id,
+            d.no_telp AS whatsapp_number
+        FROM dpjp_ranap dr
+        JOIN dokter d ON dr.kd_dokter = d.kd_dokter
+        WHERE dr.no_rawat IN ({placeholders})
+        ORDER BY dr.no_rawat, d.kd_dokter
+        """
+
+        recipients: Dict[str, List[Dict]] = {}
+        try:
+            with get_tracer().span("db.get_dpjp_recipients", rows=len(no_rawat_list)), \
+                    self.db_manager.get_connection() as conn:
+                cursor = conn.cursor(dictionary=True)
+                cursor.execute(query, list(no_rawat_list))
+                for row in cursor.fetchall():
+                    recipients.setdefault(row["no_rawat"], []).append(row)
+                cursor.close()
+        except Exception as e:
+            self.logger.error("❌ Error fetching DPJP recipients: %s", e)
+            return None
+        return recipients
+
+    # ----------------------------------------------------------- #
+    def get_doctor_contacts(self) -> List[Dict] | None:
+        """Kontak Telegram/WhatsApp semua dokter (untuk recipient directory)."""
+        query = """
+        SELECT 
+            d.kd_dokter,
+            d.nm_dokter,
+            d.telegram_id,
+            d.no_telp AS whatsapp_number
+        FROM dokter d
+        """
+
+        try:
+            with get_tracer().span("db.get_doctor_contacts"), \
+                    self.db_manager.get_connection() as conn:
+                cursor = conn.cursor(dictionary=True)
+                cursor.execute(query)
+                doctors = cursor.fetchall()
+                cursor.close()
+                return doctors
+        except Exception as e:
+            self.logger.error("❌ Error fetching doctor contacts: %s", e)
+            return None
 
     # ----------------------------------------------------------- #
     def update_notification_status(
         self, notification_id: int, status: str, error_message: str | None = None
-    ):
+    ) -> bool:
         """Perbarui status notifikasi di queue."""
         try:
-            with self.db_manager.get_connection() as conn:
+            with get_tracer().span("db.update_notification_status", notification_id=notification_id, status=status), \
+                    self.db_manager.get_connection() as conn:
                 cursor = conn.cursor()
                 if status == "sent":
                     cursor.execute(
@@ -89,8 +245,169 @@ class PatientQueries:
                     )
                 conn.commit()
                 cursor.close()
+                return True
         except Exception as e:
             self.logger.error("❌ Error updating notification status: %s", e)
+            return False
+
+    # ----------------------------------------------------------- #
+    def update_notification_statuses(
+        self, updates: List[Tuple[int, str, str | None]]
+    ) -> bool:
+        """Bulk update status (dari journal) dalam satu transaksi.
+
+        Hanya row yang masih ``pending`` (atau ``scheduled`` untuk hasil
+        akhir pengiriman tertunda) yang diubah, sehingga replay journal yang
+        sama berulang kali tidak menaikkan ``retry_count`` dua kali.
+        """
+        if not updates:
+            return True
+
+        sent_ids = [nid for nid, status, _ in updates if status == "sent"]
+        failed = [(err, nid) for nid, status, err in updates if status == "failed"]
+        scheduled_ids = [nid for nid, status, _ in updates if status == "scheduled"]
+
+        try:
+            with get_tracer().span("db.update_notification_statuses", notification_ids=[u[0] for u in updates]), \
+                    self.db_manager.get_connection() as conn:
+                cursor = conn.cursor()
+                if scheduled_ids:
+                    placeholders = ", ".join(["%s"] * len(scheduled_ids))
+                    cursor.execute(
+                        f"""
+                        UPDATE notification_queue 
+                        SET status = 'scheduled'
+                        WHERE id IN ({placeholders}) AND status = 'pending'
+                        """,
+                        scheduled_ids,
+                    )
+                if sent_ids:
+                    placeholders = ", ".join(["%s"] * len(sent_ids))
+                    cursor.execute(
+                        f"""
+                        UPDATE notification_queue 
+                        SET status = 'sent', sent_at = NOW()
+                        WHERE id IN ({placeholders}) AND status IN ('pending', 'scheduled')
+                        """,
+                        sent_ids,
+                    )
+                if failed:
+                    cursor.executemany(
+                        """
+                        UPDATE notification_queue 
+                        SET status = 'failed',
+                            retry_count = retry_count + 1,
+                            error_message = %s
+                        WHERE id = %s AND status IN ('pending', 'scheduled')
+                        """,
+                        failed,
+                    )
+                conn.commit()
+                cursor.close()
+                return True
+        except Exception as e:
+            self.logger.error("❌ Error bulk updating notification status: %s", e)
+            return False
+
+    # ----------------------------------------------------------- #
+    def get_acknowledged_ids(self, notification_ids: List[int]) -> set | None:
+        """ID notifikasi yang sudah di-acknowledge; None jika query gagal"""
+        if not notification_ids:
+            return set()
+        placeholders = ", ".join(["%s"] * len(notification_ids))
+        try:
+            with get_tracer().span("db.get_acknowledged_ids", notification_ids=notification_ids), \
+                    self.db_manager.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    f"""
+                    SELECT id FROM notification_queue
+                    WHERE id IN ({placeholders}) AND acknowledged_at IS NOT NULL
+                    """,
+                    notification_ids,
+                )
+                rows = cursor.fetchall()
+                cursor.close()
+                return {row[0] for row in rows}
+        except Exception as e:
+            self.logger.error("❌ Error reading acknowledgements: %s", e)
+            return None
+
+    # ----------------------------------------------------------- #
+    # TELEGRAM ACKNOWLEDGEMENT #
+    # ----------------------------------------------------------- #
+
+    def record_telegram_messages(self, rows: List[Tuple[str, int, int, str | None]]) -> bool:
+        """Simpan (chat_id, message_id, notification_id, kd_dokter) pesan terkirim"""
+        if not rows:
+            return True
+        try:
+            with get_tracer().span("db.record_telegram_messages", rows=len(rows)), \
+                    self.db_manager.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.executemany(
+                    """
+                    INSERT IGNORE INTO notification_telegram_message
+                        (chat_id, message_id, notification_id, kd_dokter)
+                    VALUES (%s, %s, %s, %s)
+                    """,
+                    rows,
+                )
+                conn.commit()
+                cursor.close()
+                return True
+        except Exception as e:
+            self.logger.error("❌ Error recording Telegram message ids: %s", e)
+            return False
+
+    def get_notifications_by_telegram_message(
+        self, pairs: List[Tuple[str, int]]
+    ) -> Dict[Tuple[str, int], int] | None:
+        """Map (chat_id, message_id) -> notification_id; None jika query gagal"""
+        if not pairs:
+            return {}
+        placeholders = ", ".join(["(%s, %s)"] * len(pairs))
+        try:
+            with get_tracer().span("db.get_notifications_by_telegram_message", pairs=len(pairs)), \
+                    self.db_manager.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    f"""
+                    SELECT chat_id, message_id, notification_id
+                    FROM notification_telegram_message
+                    WHERE (chat_id, message_id) IN ({placeholders})
+                    """,
+                    [value for pair in pairs for value in pair],
+                )
+                rows = cursor.fetchall()
+                cursor.close()
+                return {(str(chat_id), int(message_id)): nid for chat_id, message_id, nid in rows}
+        except Exception as e:
+            self.logger.error("❌ Error resolving Telegram replies: %s", e)
+            return None
+
+    def acknowledge_notifications(self, acks: List[Tuple[int, datetime, str]]) -> bool:
+        """Bulk set acknowledged_at / acknowledged_by; ack pertama yang berlaku"""
+        if not acks:
+            return True
+        try:
+            with get_tracer().span("db.acknowledge_notifications", notification_ids=[a[0] for a in acks]), \
+                    self.db_manager.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.executemany(
+                    """
+                    UPDATE notification_queue
+                    SET acknowledged_at = %s, acknowledged_by = %s
+                    WHERE id = %s AND acknowledged_at IS NULL
+                    """,
+                    [(acked_at, acked_by, nid) for nid, acked_at, acked_by in acks],
+                )
+                conn.commit()
+                cursor.close()
+                return True
+        except Exception as e:
+            self.logger.error("❌ Error writing acknowledgements: %s", e)
+            return False
 
     # ----------------------------------------------------------- #
     # LEGACY POLLING (opsional) #
@@ -123,7 +440,8 @@ class PatientQueries:
         """
         
         try:
-            with self.db_manager.get_connection() as conn:
+            with get_tracer().span("db.get_new_inpatients"), \
+                    self.db_manager.get_connection() as conn:
                 cursor = conn.cursor(dictionary=True)
                 cursor.execute(query, (since,))
                 patients = cursor.fetchall()
@@ -133,3 +451,124 @@ class PatientQueries:
         except Exception as e:
             self.logger.error("❌ Error fetching patients: %s", e)
             return []
+
+    # ----------------------------------------------------------- #
+    # INCREMENTAL CHANGE CAPTURE #
+    # ----------------------------------------------------------- #
+
+    _INPATIENT_COLUMNS = """
+            ki.no_rawat,
+            ki.kd_kamar,
+            ki.diagnosa_awal,
+            ki.tgl_masuk,
+            p.nm_pasien,
+            CASE 
+                WHEN p.jk = 'L' THEN 'Laki-laki'
+                WHEN p.jk = 'P' THEN 'Perempuan'
+                ELSE 'Tidak Diketahui'
+            END AS jenis_kelamin,
+            dr.kd_dokter,
+            d.nm_dokter,
+            d.telegram_id,
+            d.no_telp AS whatsapp_number
+    """
+
+    def get_inpatients_after(
+        self, tgl_masuk: datetime, no_rawat: str, limit: int = 500
+    ) -> List[Dict] | None:
+        """Row kamar_inap setelah watermark (tgl_masuk, no_rawat), urut naik.
+
+        Paging dilakukan di subquery kamar_inap saja supaya join DPJP tidak
+        memotong satu no_rawat di tengah halaman. Row tanpa DPJP tetap
+        dikembalikan dengan ``kd_dokter`` NULL. None bila query gagal.
+        """
+        query = f"""
+        SELECT {self._INPATIENT_COLUMNS}
+        FROM (
+            SELECT no_rawat, kd_kamar, diagnosa_awal, tgl_masuk
+            FROM kamar_inap
+            WHERE tgl_masuk > %s OR (tgl_masuk = %s AND no_rawat > %s)
+            ORDER BY tgl_masuk ASC, no_rawat ASC
+            LIMIT %s
+        ) ki
+        JOIN reg_periksa rp ON ki.no_rawat = rp.no_rawat  
+        JOIN pasien p ON rp.no_rkm_medis = p.no_rkm_medis
+        LEFT JOIN dpjp_ranap dr ON ki.no_rawat = dr.no_rawat
+        LEFT JOIN dokter d ON dr.kd_dokter = d.kd_dokter
+        ORDER BY ki.tgl_masuk ASC, ki.no_rawat ASC
+        """
+
+        try:
+            with get_tracer().span("db.get_inpatients_after"), \
+                    self.db_manager.get_connection() as conn:
+                cursor = conn.cursor(dictionary=True)
+                cursor.execute(query, (tgl_masuk, tgl_masuk, no_rawat, limit))
+                patients = cursor.fetchall()
+                cursor.close()
+                return patients
+        except Exception as e:
+            self.logger.error("❌ Error fetching inpatient changes: %s", e)
+            return None
+
+    def get_inpatients_by_no_rawat(self, no_rawat_list: List[str]) -> List[Dict] | None:
+        """Detail pasien untuk no_rawat tertentu (reader binlog & cek ulang DPJP).
+
+        None bila query gagal.
+        """
+        if not no_rawat_list:
+            return []
+        placeholders = ", ".join(["%s"] * len(no_rawat_list))
+        query = f"""
+        SELECT {self._INPATIENT_COLUMNS}
+        FROM kamar_inap ki
+        JOIN reg_periksa rp ON ki.no_rawat = rp.no_rawat  
+        JOIN pasien p ON rp.no_rkm_medis = p.no_rkm_medis
+        LEFT JOIN dpjp_ranap dr ON ki.no_rawat = dr.no_rawat
+        LEFT JOIN dokter d ON dr.kd_dokter = d.kd_dokter
+        WHERE ki.no_rawat IN ({placeholders})
+        ORDER BY ki.tgl_masuk ASC, ki.no_rawat ASC
+        """
+
+        try:
+            with get_tracer().span("db.get_inpatients_by_no_rawat", rows=len(no_rawat_list)), \
+                    self.db_manager.get_connection() as conn:
+                cursor = conn.cursor(dictionary=True)
+                cursor.execute(query, list(no_rawat_list))
+                patients = cursor.fetchall()
+                cursor.close()
+                return patients
+        except Exception as e:
+            self.logger.error("❌ Error fetching inpatients by no_rawat: %s", e)
+            return None
+
+    def enqueue_notifications(
+        self, no_rawat_list: List[str], notification_type: str = "new_patient_dpjp"
+    ) -> int | None:
+        """Masukkan row ke notification_queue (pengganti trigger dpjp_ranap).
+
+        no_rawat yang sudah ada di queue dilewati. Mengembalikan jumlah row
+        baru, atau None bila gagal (caller tidak boleh commit watermark).
+        """
+        if not no_rawat_list:
+            return 0
+        try:
+            with get_tracer().span("db.enqueue_notifications", rows=len(no_rawat_list)), \
+                    self.db_manager.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.executemany(
+                    """
+                    INSERT INTO notification_queue (no_rawat, notification_type, status, created_at)
+                    SELECT %s, %s, 'pending', NOW() FROM DUAL
+                    WHERE NOT EXISTS (
+                        SELECT 1 FROM notification_queue WHERE no_rawat = %s
+                    )
+                    """,
+                    [(no_rawat, notification_type, no_rawat) for no_rawat in no_rawat_list],
+                )
+                conn.commit()
+                inserted = cursor.rowcount
+                cursor.close()
+                return inserted
+        except Exception as e:
+            self.logger.error("❌ Error enqueueing notifications: %s", e)
+            return None
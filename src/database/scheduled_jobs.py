@@ -0,0 +1,106 @@
+import json
+import logging
+from datetime import datetime
+from typing import Dict, List
+
+from database.outbox import encode_json_value, decode_json_value
+from utils.tracing import get_tracer
+
+
+class ScheduledJobStore:
+    """Persistensi job TimerScheduler di tabel ``notification_scheduled_job``.
+
+    ``owner`` = index shard pembuat job, supaya tiap worker hanya memuat job
+    miliknya; shard 0 ikut memuat job milik shard yang sudah tidak ada
+    setelah rebalance.
+    """
+
+    def __init__(self, db_manager, shard: tuple | None = None):
+        self.db_manager = db_manager
+        self.logger = logging.getLogger(__name__)
+        self.owner = shard[1] if shard else 0
+        self.owner_count = shard[2] if shard else 1
+
+    def add(self, kind: str, due_at: datetime, payload: dict, dedupe_key: str | None = None) -> int | None:
+        try:
+            with get_tracer().span("db.add_scheduled_job", kind=kind), \
+                    self.db_manager.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    """
+                    INSERT INTO notification_scheduled_job
+                        (kind, due_at, dedupe_key, owner, payload, status)
+                    VALUES (%s, %s, %s, %s, %s, 'pending')
+                    """,
+                    (kind, due_at, dedupe_key, self.owner,
+                     json.dumps(payload, default=encode_json_value)),
+                )
+                job_id = cursor.lastrowid
+                conn.commit()
+                cursor.close()
+                return job_id
+        except Exception as e:
+            self.logger.error("❌ Error persisting scheduled %s job: %s", kind, e)
+            return None
+
+    def update_payload(self, job_id: int, payload: dict) -> bool:
+        try:
+            with get_tracer().span("db.update_scheduled_job", job_id=job_id), \
+                    self.db_manager.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    """
+                    UPDATE notification_scheduled_job SET payload = %s
+                    WHERE id = %s AND status = 'pending'
+                    """,
+                    (json.dumps(payload, default=encode_json_value), job_id),
+                )
+                conn.commit()
+                cursor.close()
+                return True
+        except Exception as e:
+            self.logger.error("❌ Error updating scheduled job %s: %s", job_id, e)
+            return False
+
+    def load_pending(self) -> List[Dict]:
+        try:
+            with get_tracer().span("db.load_scheduled_jobs"), \
+                    self.db_manager.get_connection() as conn:
+                cursor = conn.cursor(dictionary=True)
+                cursor.execute(
+                    """
+                    SELECT id, kind, due_at, dedupe_key, payload
+                    FROM notification_scheduled_job
+                    WHERE status = 'pending'
+                      AND (owner = %s OR (%s = 0 AND owner >= %s))
+                    ORDER BY due_at
+                    """,
+                    (self.owner, self.owner, self.owner_count),
+                )
+                rows = cursor.fetchall()
+                cursor.close()
+        except Exception as e:
+            self.logger.error("❌ Error loading scheduled jobs: %s", e)
+            return []
+        for row in rows:
+            row["payload"] = json.loads(row["payload"], object_hook=decode_json_value)
+        return rows
+
+    def mark_done(self, job_ids: List[int]) -> bool:
+        if not job_ids:
+            return True
+        placeholders = ", ".join(["%s"] * len(job_ids))
+        try:
+            with get_tracer().span("db.mark_scheduled_jobs_done", jobs=len(job_ids)), \
+                    self.db_manager.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    f"UPDATE notification_scheduled_job SET status = 'done' WHERE id IN ({placeholders})",
+                    job_ids,
+                )
+                conn.commit()
+                cursor.close()
+                return True
+        except Exception as e:
+            self.logger.error("❌ Error marking scheduled jobs done: %s", e)
+            return False
@@ -1,30 +1,145 @@
 #!/usr/bin/env python3
 
+import asyncio
+import contextvars
+import functools
 import os
+import queue
 import sys
 import time
-import schedule
+from datetime import datetime
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
 
 from database.connection import DatabaseManager
 from database.queries import PatientQueries
-from notifiers.telegram import TelegramNotifier
-from notifiers.whatsapp import WhatsAppNotifier
+from database.change_capture import InpatientChangeCapture
+from database.outbox import StatusOutbox, DEFAULT_OUTBOX_PATH
+from database.analytics import DeliveryRollup
+from database.scheduled_jobs import ScheduledJobStore
+from notifiers.registry import build_notifiers
+from notifiers.telegram_ack import TelegramAckConsumer, TelegramMessageLog
+from notifiers.fanout import RecipientFanOut
+from notifiers.directory import RecipientDirectory
 from utils.logger import get_logger
 from utils.config import Config
+from utils.journal import SendJournal, DEFAULT_JOURNAL_PATH
+from utils.tracing import configure_tracing, DEFAULT_TRACE_PATH
+from utils.adaptive import AdaptiveBatchController
+from utils.circuit import ProviderCircuit
+from utils.channel_queue import ChannelQueue, PendingRow, all_done
+from utils.health import HealthMonitor, HealthServer
+from utils.send_policy import SendPolicy, recipient_key
+from utils.timer import TimerScheduler
+from supervisor import ShardSupervisor, shard_file
 
 LOCK_FILE = "notifikasi_lock.pid"
 
 class HospitalNotificationQueueMonitor:
-    def __init__(self):
-        """Initialize sistem monitoring notifikasi rawat inap"""
+    def __init__(self, shard: tuple | None = None):
+        """Initialize sistem monitoring notifikasi rawat inap
+
+        ``shard`` = (key, index, count) saat dijalankan sebagai worker
+        ShardSupervisor; None = satu proses memegang seluruh queue.
+        """
         self.config = Config()
         self.logger = get_logger(__name__)
+        self.shard = shard
+        self.lock_file = shard_file(LOCK_FILE, shard)
+        self.tracer = configure_tracing({
+            **self.config.tracing,
+            "file": shard_file(self.config.tracing.get("file") or DEFAULT_TRACE_PATH, shard),
+        })
         self.db_manager = DatabaseManager(self.config.database)
-        self.patient_queries = PatientQueries(self.db_manager)
-        self.telegram = TelegramNotifier(self.config.telegram)
-        self.whatsapp = WhatsAppNotifier(self.config.whatsapp)
+        self.patient_queries = PatientQueries(self.db_manager, shard)
+        self.notifiers = build_notifiers(self.config)
+        self.directory = RecipientDirectory(self.patient_queries, self.config.directory)
+        for notifier in self.notifiers.values():
+            notifier.bad_recipient_callback = self.directory.mark_bad
+        # Queue + worker per channel, dikonsumsi independen; row difinalisasi
+        # di thread scheduler begitu hasil semua channel-nya masuk
+        self.channel_queues = {
+            name: ChannelQueue(
+                name,
+                workers=self.config.channel(name).get("workers", 1),
+                max_backlog=self.config.channel(name).get("max_backlog", 1000),
+            )
+            for name in self.notifiers
+        }
+        self._completed_rows = queue.SimpleQueue()
+        self._in_flight = set()
+        self.telegram_messages = None
+        self.ack_consumer = None
+        acknowledgements = self.config.channel("telegram").get("acknowledgements") or {}
+        if "telegram" in self.notifiers and acknowledgements.get("enabled", False):
+            self.telegram_messages = TelegramMessageLog(self.patient_queries)
+            self.notifiers["telegram"].sent_message_callback = self.telegram_messages.record
+            # getUpdates hanya boleh satu consumer per bot (shard 0)
+            if shard is None or shard[1] == 0:
+                self.ack_consumer = TelegramAckConsumer(
+                    self.notifiers["telegram"],
+                    self.patient_queries,
+                    self.telegram_messages,
+                    acknowledgements,
+                )
+        self.fanout = RecipientFanOut(
+            self.patient_queries, self.config.ward_subscriptions, self.directory
+        )
+        self.journal = SendJournal(
+            shard_file(self.config.app.get("journal_file") or DEFAULT_JOURNAL_PATH, shard),
+            fsync_every=self.config.app.get("journal_fsync_every", 50),
+        )
+        self.outbox = None
+        if self.config.outbox.get("enabled", False):
+            self.outbox = StatusOutbox(
+                shard_file(self.config.outbox.get("file") or DEFAULT_OUTBOX_PATH, shard)
+            )
+        self.outbox_prefetch = max(1, self.config.outbox.get("snapshot_prefetch", 2))
+        self.change_capture = None
+        # Change capture cukup dijalankan satu worker (shard 0)
+        if self.config.change_capture.get("enabled", False) and (shard is None or shard[1] == 0):
+            self.change_capture = InpatientChangeCapture(
+                self.patient_queries, self.config.change_capture, self.config.database
+            )
+        self.analytics = None
+        if self.config.analytics.get("enabled", False):
+            self.analytics = DeliveryRollup(self.db_manager)
+        self.batch_controller = None
+        if self.config.adaptive_batch.get("enabled", False):
+            self.batch_controller = AdaptiveBatchController(
+                self.config.adaptive_batch, self.config.app.get("check_interval", 10)
+            )
+        self.send_policy = SendPolicy(self.config.send_policies)
+        if self.send_policy.reminder_enabled and not self._ack_channels():
+            # Tanpa acknowledgement, reminder akan terkirim ke semua penerima
+            self.logger.warning(
+                "⚠️ Reminders need a channel that records acknowledgements "
+                "(telegram.acknowledgements.enabled), reminders disabled"
+            )
+            self.send_policy.reminder_enabled = False
+        # Job tertunda (quiet hours, digest, reminder) dipersist ke DB
+        self.scheduler = TimerScheduler(
+            ScheduledJobStore(self.db_manager, shard) if self.send_policy.enabled else None
+        )
+        self.scheduler.register("deliver", self._run_delivery_job)
+        self.scheduler.register("reminder", self._run_reminder_job)
+        self.circuits = {
+            channel: ProviderCircuit(
+                channel,
+                self.config.health.get("circuit_failure_threshold", 5),
+                self.config.health.get("circuit_reset_seconds", 60),
+            )
+            for channel in self.notifiers
+        }
+        self.health = HealthMonitor(
+            self.config.health,
+            self.db_manager.test_connection,
+            self.patient_queries.get_queue_lag_seconds,
+            self.circuits,
+            self._tick_interval,
+            self.channel_queues,
+        )
+        self.health_server = None
 
     # ------------------------------------------------------------ #
     def test_connections(self):
@@ -40,143 +155,785 @@ class HospitalNotificationQueueMonitor:
         except Exception as e:
             self.logger.error(f"❌ Database connection error: {e}")
 
-        # Test Telegram connection
-        try:
-            if hasattr(self.telegram, 'test_connection') and self.telegram.test_connection():
-                self.logger.info("✅ Telegram connection OK")
-            else:
-                self.logger.error("❌ Telegram connection failed")
-        except Exception as e:
-            self.logger.error(f"❌ Telegram connection error: {e}")
+        # Channel dengan test_connection di-test; lainnya hanya cek enabled
+        for name, notifier in self.notifiers.items():
+            try:
+                if not notifier.enabled:
+                    self.logger.info(f"⚠️ {name} notification disabled")
+                elif not hasattr(notifier, 'test_connection'):
+                    self.logger.info(f"✅ {name} notification enabled")
+                elif notifier.test_connection():
+                    self.logger.info(f"✅ {name} connection OK")
+                else:
+                    self.logger.error(f"❌ {name} connection failed")
+            except Exception as e:
+                self.logger.error(f"❌ {name} connection error: {e}")
 
-        # WhatsApp - hanya cek apakah enabled atau tidak (no connection test)
+    def start_health_server(self):
+        """Jalankan endpoint /health dan /ready bila diaktifkan di config"""
+        if not self.config.health.get("enabled", False):
+            return
         try:
-            if self.whatsapp.enabled:
-                self.logger.info("✅ WhatsApp notification enabled")
-            else:
-                self.logger.info("⚠️ WhatsApp notification disabled")
-        except Exception as e:
-            self.logger.error(f"❌ WhatsApp configuration error: {e}")
+            self.health_server = HealthServer(
+                self.health,
+                self.config.health.get("host", "127.0.0.1"),
+                self.config.health.get("port", 8085) + (self.shard[1] if self.shard else 0),
+            )
+            self.health_server.start()
+        except OSError as e:
+            self.health_server = None
+            self.logger.error("❌ Health endpoint failed to start: %s", e)
 
     def process_notification_queue(self):
-        """Ambil notifikasi pending, kirim Telegram + WhatsApp, update status."""
+        """Ambil notifikasi pending, kirim ke semua channel, update status."""
+        tick_ok = True
         try:
-            self.logger.info("🔍 Checking notification queue…")
-            pending = self.patient_queries.get_pending_notifications()
-            notif_ids = [notif.get("notification_id") for notif in pending]
-            self.logger.info(f"--- NOTIFIKASI DIAMBIL ({len(pending)}): {notif_ids}")
-            if not pending:
-                self.logger.info("ℹ️ No pending notifications")
-                return
+            with self.tracer.span("tick"):
+                self.logger.info("🔍 Checking notification queue…")
+                self.capture_inpatient_changes()
+                self.drain_outbox()
+                self.commit_journal()
+                self.directory.refresh()
+                self._adapt_batch()
+                if self._channels_backlogged():
+                    return
+                batch = self._dequeue_batch()
+                if not batch:
+                    return
 
-            self.logger.info("🆕 Found %s pending notifications", len(pending))
-            for notif in pending:
-                self._process_single_notification(notif)
+                self._process_batch(self._apply_send_policies(batch))
+                self.commit_journal()
+                self.flush_buffers()
         except Exception as err:
+            tick_ok = False
             self.logger.error("❌ Error processing queue: %s", err)
+        finally:
+            self.health.record_tick(tick_ok)
 
     # ------------------------------------------------------------ #
-    def _process_single_notification(self, notif: dict):
-        """Process single notification dengan dual channel (Telegram + WhatsApp)"""
-        notif_id = notif["notification_id"]
+    def _dequeue_batch(self) -> list:
+        """Ambil batch pending + fan-out; saat MySQL down, baca dari snapshot outbox"""
+        limit = self._batch_size()
+        with self.tracer.span("dequeue"):
+            fetch_limit = limit * self.outbox_prefetch if self.outbox else limit
+            rows = self.patient_queries.get_pending_notifications(fetch_limit)
+            pending = self._filter_journaled(rows or [])
 
-        try:
+        notif_ids = [notif.get("notification_id") for notif in pending]
+        self.logger.info(f"--- NOTIFIKASI DIAMBIL ({len(pending)}): {notif_ids}")
+        with self.tracer.span("fanout", notification_ids=notif_ids):
+            batch = self.fanout.expand(pending)
+
+        if self.outbox is not None:
+            if rows is None or (pending and not batch):
+                # MySQL tidak bisa diakses: lanjutkan dari snapshot terakhir
+                batch = self.outbox.take_snapshot(limit, self._has_outcome)
+                if batch:
+                    self.logger.warning(
+                        "⚠️ Database unavailable, serving %s notifications from local snapshot",
+                        len(batch)
+                    )
+            else:
+                # Snapshot hanya berisi row yang TIDAK dikirim tick ini
+                self.outbox.save_snapshot(batch[limit:])
+                batch = batch[:limit]
+
+        if not batch:
+            self.logger.info("ℹ️ No pending notifications")
+        else:
+            self.logger.info("🆕 Found %s pending notifications", len(batch))
+        return batch
+
+    def drain_outbox(self) -> bool:
+        """Kirim update status yang di-buffer selama outage ke MySQL (bulk, berurutan)"""
+        if self.outbox is None or self.outbox.size() == 0:
+            return True
+        with self.tracer.span("outbox.drain"):
+            return self.outbox.drain(self.patient_queries)
+
+    def _has_outcome(self, notification_id: int) -> bool:
+        if self.journal.has_outcome(notification_id):
+            return True
+        return self.outbox is not None and self.outbox.has_outcome(notification_id)
+
+    # ------------------------------------------------------------ #
+    def _batch_size(self) -> int:
+        return self.batch_controller.batch_size if self.batch_controller else 10
+
+    def _tick_interval(self) -> int:
+        if self.batch_controller:
+            return self.batch_controller.interval
+        return self.config.app.get("check_interval", 10)
+
+    def _adapt_batch(self):
+        """Ukur kedalaman queue lalu sesuaikan batch size & interval tick"""
+        if self.batch_controller is None:
+            return
+        self.batch_controller.update(self.patient_queries.count_pending_notifications())
+
+    def _record_latency(self, channel: str, seconds: float, messages: int = 1):
+        if self.batch_controller is not None and messages:
+            self.batch_controller.record_latency(channel, seconds / messages)
+
+    # ------------------------------------------------------------ #
+    def capture_inpatient_changes(self):
+        """Mode tanpa trigger: masukkan pasien baru dari change capture ke queue"""
+        if self.change_capture is None:
+            return
+        with self.tracer.span("change_capture"):
+            rows = self.change_capture.poll()
+        if rows is None:
+            return
+        no_rawat_list = list(dict.fromkeys(row["no_rawat"] for row in rows))
+        if no_rawat_list:
+            inserted = self.patient_queries.enqueue_notifications(no_rawat_list)
+            if inserted is None:
+                # Watermark tidak dimajukan: row dibaca ulang di tick berikutnya
+                self.logger.warning("⚠️ Enqueue failed, change capture will retry")
+                return
+            self.logger.info("📊 Enqueued %s notifications from change capture", inserted)
+        self.change_capture.commit()
+
+    def commit_journal(self) -> bool:
+        """Replay outcome di journal yang belum ter-commit ke database (bulk)."""
+        updates = self.journal.pending_outcomes()
+        if not updates:
+            return True
+        with self.tracer.span("commit", rows=len(updates)):
+            self.journal.flush()
+            committed = self.patient_queries.update_notification_statuses(updates)
+        if not committed:
+            if self.outbox is None:
+                self.logger.warning(
+                    "⚠️ %s status updates kept in journal, DB write failed", len(updates)
+                )
+                return False
+            # Pindahkan ke outbox SQLite (durable, urut) sampai MySQL kembali
+            self.outbox.enqueue(updates)
+            self.journal.record_committed([nid for nid, _, _ in updates])
+            self.journal.compact()
+            return False
+        self.journal.record_committed([nid for nid, _, _ in updates])
+        self.journal.compact()
+        self.logger.info("📊 Committed %s journaled status updates", len(updates))
+        return True
+
+    def _replay_orphan_journals(self):
+        """Shard 0 me-replay journal shard yang hilang setelah rebalance"""
+        if self.shard is None or self.shard[1] != 0:
+            return
+        key, _, count = self.shard
+        base = self.config.app.get("journal_file") or DEFAULT_JOURNAL_PATH
+        index = count
+        while os.path.exists(shard_file(base, (key, index, count))):
+            orphan = SendJournal(shard_file(base, (key, index, count)))
+            updates = orphan.pending_outcomes()
+            if self.patient_queries.update_notification_statuses(updates):
+                orphan.record_committed([nid for nid, _, _ in updates])
+                orphan.compact()
+                self.logger.info(
+                    "📊 Replayed %s outcomes from orphaned shard %s journal", len(updates), index
+                )
+            orphan.close()
+            index += 1
+
+    def _drain_orphan_outboxes(self):
+        """Shard 0 men-drain outbox SQLite shard yang hilang setelah rebalance"""
+        if self.outbox is None or self.shard is None or self.shard[1] != 0:
+            return
+        key, _, count = self.shard
+        base = self.config.outbox.get("file") or DEFAULT_OUTBOX_PATH
+        index = count
+        while os.path.exists(shard_file(base, (key, index, count))):
+            orphan = StatusOutbox(shard_file(base, (key, index, count)))
+            buffered = orphan.size()
+            if buffered and orphan.drain(self.patient_queries):
+                self.logger.info(
+                    "📊 Drained %s status updates from orphaned shard %s outbox", buffered, index
+                )
+            orphan.close()
+            index += 1
+
+    def _filter_journaled(self, pending: list) -> list:
+        """Jangan kirim ulang row yang outcome-nya sudah ada di journal / outbox"""
+        skipped = [n for n in pending if self._has_outcome(n["notification_id"])]
+        if skipped:
+            self.logger.warning(
+                "⚠️ Skipping %s notifications already journaled: %s",
+                len(skipped),
+                [n["notification_id"] for n in skipped],
+            )
+        # Row yang masih di queue channel belum punya outcome tapi jangan diambil lagi
+        return [
+            n for n in pending
+            if not self._has_outcome(n["notification_id"])
+            and n["notification_id"] not in self._in_flight
+        ]
+
+    def _channels_backlogged(self) -> bool:
+        """Laporkan backlog per channel; tahan dequeue selama ada yang penuh"""
+        backlog = {name: q.backlog() for name, q in self.channel_queues.items()}
+        full = [name for name, q in self.channel_queues.items() if q.is_full()]
+        if full:
+            self.logger.warning(
+                "⏸️ Channel backlog full (%s), not dequeuing new notifications: %s",
+                ", ".join(full),
+                backlog,
+            )
+        elif any(backlog.values()):
+            self.logger.info("📊 Channel backlog: %s", backlog)
+        return bool(full)
+
+    # ------------------------------------------------------------ #
+    def _process_batch(self, batch: list):
+        """Antrikan semua pesan batch ke queue channel masing-masing.
+
+        Tick tidak menunggu pengiriman: tiap row difinalisasi sendiri begitu
+        semua channel-nya selesai (lihat _finalize_completed), sehingga
+        channel yang lambat hanya menahan row yang memakai channel itu.
+        """
+        for notif, messages in batch:
             self.logger.info(
-                "📤 Processing notification %s for %s",
-                notif_id,
-                notif["nm_pasien"]
+                "📤 Processing notification %s for %s (%s recipients)",
+                notif["notification_id"],
+                notif["nm_pasien"],
+                len(messages)
+            )
+            self.journal.record_attempt(notif["notification_id"])
+        self._dispatch(batch)
+
+    def _dispatch(self, batch: list, channels=None, finalize: bool = True) -> list:
+        """Antrikan pesan tiap row ke queue channel tanpa menunggu hasilnya.
+
+        Kembalikan future per row yang selesai setelah row itu difinalisasi.
+        """
+        futures = []
+        for row in batch:
+            targets = [
+                (name, key, message)
+                for name, channel_targets in self._dispatch_targets([row], channels).items()
+                for key, message in channel_targets
+            ]
+            if finalize:
+                self._in_flight.add(row[0]["notification_id"])
+            pending = PendingRow(row, len(targets), finalize, self._row_completed)
+            for name, key, message in targets:
+                self._submit(name, message, [(pending, key)])
+            futures.append(pending.future)
+        return futures
+
+    def _dispatch_digest(self, items: list) -> list:
+        """Digest: satu pesan gabungan per channel untuk semua item satu penerima.
+
+        Hasil pesan gabungan berlaku untuk setiap pesan asal, sehingga tiap row
+        tetap difinalisasi (outcome, analitik) sendiri-sendiri. Channel per-row
+        tetap dikirim per row untuk item final.
+        """
+        rows = [
+            ((i["notif"], [{**m, "digested": True} for m in i["messages"]]), i["finalize"])
+            for i in items
+        ]
+        messages = [m for (_, row_messages), _ in rows for m in row_messages]
+        combined = {**messages[0], "notification_id": None, "digest": messages}
+        channels = [
+            name for name in self._message_channels()
+            if self._should_send(name, self.notifiers[name], combined)
+        ]
+        owners = {name: [] for name in channels}
+        futures = []
+        for row, finalize in rows:
+            row_targets = [
+                (name, key, message)
+                for name, channel_targets in self._dispatch_targets(
+                    [row], self._row_channels() if finalize else []
+                ).items()
+                for key, message in channel_targets
+            ]
+            if finalize:
+                self._in_flight.add(row[0]["notification_id"])
+            pending = PendingRow(
+                row, len(row_targets) + len(row[1]) * len(channels), finalize, self._row_completed
             )
+            for name, key, message in row_targets:
+                self._submit(name, message, [(pending, key)])
+            for name in channels:
+                owners[name].extend((pending, m) for m in row[1])
+            futures.append(pending.future)
+        for name in channels:
+            self._submit(name, combined, owners[name])
+        return futures
+
+    def _submit(self, name: str, message: dict, owners: list):
+        """Antrikan satu pesan; hasilnya dicatat ke setiap ``(PendingRow, kunci)``"""
+        self.channel_queues[name].submit(
+            functools.partial(
+                contextvars.copy_context().run,
+                self._send_via_channel, name, self.notifiers[name], message,
+            ),
+            functools.partial(self._record_result, owners, name),
+        )
+
+    @staticmethod
+    def _record_result(owners: list, name: str, sent: bool):
+        for pending, key in owners:
+            pending.record(key, name, sent)
 
-            # Send to both channels
-            telegram_sent = False
-            whatsapp_sent = False
+    def _row_completed(self, pending: PendingRow):
+        """Dipanggil worker channel: serahkan finalisasi ke thread scheduler"""
+        self._completed_rows.put(pending)
+        self.scheduler.call_soon(self._finalize_completed)
 
-            # Try Telegram
+    def _finalize_completed(self):
+        """Finalisasi row yang hasil semua channel-nya sudah masuk, lalu commit bulk"""
+        done = []
+        while True:
             try:
-                if notif.get("telegram_id"):
-                    telegram_sent = self.telegram.send_patient_notification(notif)
-                    if telegram_sent:
-                        self.logger.info("✅ Telegram sent successfully")
-                    else:
-                        self.logger.warning("⚠️ Telegram send failed")
-                else:
-                    self.logger.warning("⚠️ Doctor %s has no Telegram ID", notif["nm_dokter"])
-            except Exception as e:
-                self.logger.error("❌ Telegram send error: %s", e)
+                pending = self._completed_rows.get_nowait()
+            except queue.Empty:
+                break
+            self._finalize_batch([pending.row], pending.sent, pending.finalize)
+            if pending.finalize:
+                self._in_flight.discard(pending.row[0]["notification_id"])
+            done.append(pending)
+        if not done:
+            return
+        self.commit_journal()
+        self.flush_buffers()
+        for pending in done:
+            pending.future.set_result(None)
+
+    def _dispatch_targets(self, batch: list, channels=None) -> dict:
+        """Pesan per channel: ``{channel: [(kunci, pesan)]}``.
+
+        Channel ``per_notification`` mendapat satu pesan per queue row (kunci
+        ``notif``, pesan = row + ``recipients``); channel lain satu pesan per
+        penerima. Kunci dipakai sebagai ``(id(kunci), channel)`` di set sent.
+        """
+        targets = {}
+        for name, notifier in self.notifiers.items():
+            if channels is not None and name not in channels:
+                continue
+            if notifier.per_notification:
+                candidates = [
+                    (notif, {**notif, "recipients": messages}) for notif, messages in batch
+                ]
+            else:
+                candidates = [(m, m) for _, messages in batch for m in messages]
+            targets[name] = [
+                (key, message) for key, message in candidates
+                if self._should_send(name, notifier, message)
+            ]
+        return targets
+
+    def _message_channels(self) -> list:
+        """Channel yang dikirim per penerima"""
+        return [name for name, n in self.notifiers.items() if not n.per_notification]
+
+    def _row_channels(self) -> list:
+        """Channel aktif yang dikirim sekali per queue row"""
+        return [name for name, n in self.notifiers.items() if n.per_notification and n.enabled]
+
+    def _ack_channels(self) -> list:
+        """Channel per penerima yang bisa mencatat acknowledgement (target reminder)"""
+        return [
+            name for name in self._message_channels()
+            if self.notifiers[name].records_acks and self.notifiers[name].enabled
+        ]
 
-            # Try WhatsApp
+    def _delivered(self, channels: dict) -> bool:
+        """Penerima dianggap terkirim bila channel yang dihitung sebagai pengiriman sukses"""
+        return any(ok for name, ok in channels.items() if self.notifiers[name].counts_as_delivery)
+
+    def _should_send(self, name: str, notifier, message: dict) -> bool:
+        reason = notifier.missing_reason(message)
+        if reason and notifier.enabled:
+            self.logger.warning("⚠️ %s has %s", message["recipient_name"], reason)
+        return reason is None
+
+    def _send_via_channel(self, name: str, notifier, message: dict) -> bool:
+        """Kirim satu pesan penerima lewat satu channel (dipanggil di worker channel)"""
+        try:
+            with self.tracer.span(
+                "send", channel=name, notification_id=message["notification_id"]
+            ) as span:
+                started = time.monotonic()
+                sent = notifier.send_patient_notification(message)
+                self._record_latency(name, time.monotonic() - started)
+                self.circuits[name].record(sent)
+                span.set_attribute("success", sent)
+            if sent:
+                self.logger.info("✅ %s sent successfully", name)
+            else:
+                self.logger.warning("⚠️ %s send failed", name)
+            return sent
+        except Exception as e:
+            self.logger.error("❌ %s send error: %s", name, e)
+            return False
+
+    def _finalize_batch(self, batch: list, sent: set, finalize: bool = True):
+        """``sent`` berisi pasangan (id(message|notif), channel) yang berhasil terkirim.
+
+        ``finalize=False`` untuk pengiriman tambahan (reminder, sisa pesan
+        tertunda) yang tidak mengubah status row; channel per-row hanya
+        dikirim bersama pengiriman final.
+        """
+        for notif, messages in batch:
             try:
-                if notif.get("whatsapp_number"):
-                    whatsapp_sent = self.whatsapp.send_patient_notification(notif)
-                    if whatsapp_sent:
-                        self.logger.info("✅ WhatsApp sent successfully")
-                    else:
-                        self.logger.warning("⚠️ WhatsApp send failed")
+                results = [
+                    (m, {name: (id(m), name) in sent for name in self._message_channels()})
+                    for m in messages
+                ]
+                row_results = (
+                    {name: (id(notif), name) in sent for name in self._row_channels()}
+                    if finalize else {}
+                )
+                self._record_analytics(results, notif, row_results)
+                for name, ok in row_results.items():
+                    if not ok:
+                        self.logger.warning(
+                            "⚠️ Notification %s: %s send failed", notif["notification_id"], name
+                        )
+                if finalize:
+                    self._finalize_notification(notif, results)
                 else:
-                    self.logger.warning("⚠️ Doctor %s has no WhatsApp number", notif["nm_dokter"])
-            except Exception as e:
-                self.logger.error("❌ WhatsApp send error: %s", e)
+                    self.logger.info(
+                        "✅ Follow-up for notification %s - %s",
+                        notif["notification_id"],
+                        ", ".join(
+                            f"{m['recipient_name']} ({self._channel_summary(channels)})"
+                            for m, channels in results
+                        )
+                    )
+            except Exception as err:
+                self.journal.record_outcome(notif["notification_id"], "failed", str(err))
+                self.logger.error(
+                    "💥 Error processing notification %s: %s", notif["notification_id"], err
+                )
 
-            # Update status based on results
-            if telegram_sent or whatsapp_sent:
-                # Success if at least one channel worked
-                self.patient_queries.update_notification_status(notif_id, "sent")
-                self.logger.info(
-                    "✅ Notification %s sent - TG: %s, WA: %s",
+    def _record_analytics(self, results: list, notif: dict | None = None,
+                          row_results: dict | None = None):
+        """Catat hasil per pesan per channel (dan per row untuk channel per-row)"""
+        if self.analytics is None:
+            return
+        for name, ok in (row_results or {}).items():
+            if ok:
+                self.analytics.record(notif, name, "sent")
+            else:
+                self.analytics.record(notif, name, "failed", f"{name} send failed")
+        for message, channels in results:
+            if message.get("reminder"):
+                # Reminder bukan pengiriman baru; jangan gandakan sent/failed
+                continue
+            skipped_contacts = message.get("skipped_contacts") or {}
+            for name in channels:
+                notifier = self.notifiers[name]
+                missing = notifier.missing_reason(message)
+                if channels[name]:
+                    self.analytics.record(message, name, "sent")
+                elif missing is None:
+                    self.analytics.record(message, name, "failed", f"{name} send failed")
+                elif notifier.enabled:
+                    self.analytics.record(
+                        message, name, "skipped", skipped_contacts.get(name) or missing
+                    )
+
+    def flush_buffers(self):
+        """Tulis buffer per tick: rollup analitik + message_id Telegram"""
+        if self.analytics is not None:
+            self.analytics.flush()
+        if self.telegram_messages is not None:
+            self.telegram_messages.flush()
+
+    def _finalize_notification(self, notif: dict, results: list):
+        """Agregasi hasil per penerima jadi satu outcome row, dicatat ke journal.
+
+        ``results`` berisi tuple ``(message, {channel: sent})``.
+        Row dianggap sent bila minimal satu penerima menerima lewat salah satu
+        channel yang ``counts_as_delivery``; status DB ditulis bulk lewat
+        commit_journal().
+        """
+        notif_id = notif["notification_id"]
+        delivered = [r for r in results if self._delivered(r[1])]
+        failed = [r for r in results if not self._delivered(r[1])]
+
+        if delivered:
+            self.journal.record_outcome(notif_id, "sent")
+            self._schedule_reminder(notif, [m for m, _ in delivered], 1)
+            self.logger.info(
+                "✅ Notification %s sent to %s/%s recipients - %s",
+                notif_id,
+                len(delivered),
+                len(results),
+                ", ".join(
+                    f"{m['recipient_name']} ({self._channel_summary(channels)})"
+                    for m, channels in results
+                )
+            )
+            if failed:
+                self.logger.warning(
+                    "⚠️ Notification %s partially failed: %s",
                     notif_id,
-                    "✓" if telegram_sent else "✗",
-                    "✓" if whatsapp_sent else "✗"
+                    self._aggregate_error_message(failed)
                 )
-            else:
-                # Failed both channels
-                error_msg = self._generate_error_message(notif)
-                self.patient_queries.update_notification_status(
-                    notif_id, "failed", error_msg
+        else:
+            error_msg = self._aggregate_error_message(failed) or "No recipients resolved"
+            self.journal.record_outcome(notif_id, "failed", error_msg)
+            self.logger.error("❌ Notification %s completely failed: %s", notif_id, error_msg)
+
+    def _aggregate_error_message(self, failed: list) -> str:
+        return "; ".join(
+            f"{m['recipient_name']}: {self._generate_error_message(m)}{self._skipped_contacts_message(m)}"
+            for m, _ in failed
+        )
+
+    @staticmethod
+    def _channel_summary(channels: dict) -> str:
+        return ", ".join(f"{name}: {'✓' if ok else '✗'}" for name, ok in channels.items())
+
+    # ------------------------------------------------------------ #
+    # SEND POLICIES (quiet hours, digest, reminder) #
+    # ------------------------------------------------------------ #
+    def _apply_send_policies(self, batch: list) -> list:
+        """Jadwalkan pesan yang kena quiet hours / digest; kembalikan yang dikirim sekarang.
+
+        Row yang semua pesannya ditunda ditandai ``scheduled``; job tertunda
+        paling awal yang menentukan status akhirnya. Bila job gagal dipersist,
+        pesan dikirim langsung.
+        """
+        if not (self.send_policy.quiet_enabled or self.send_policy.digest_enabled):
+            return batch
+
+        now = datetime.now()
+        immediate = []
+        for notif, messages in batch:
+            send_now = []
+            deferred = {}
+            for message in messages:
+                digest_due = self.send_policy.digest_due(message, now)
+                due = digest_due or self.send_policy.quiet_until(message, now)
+                if due is None:
+                    send_now.append(message)
+                else:
+                    digest_key = recipient_key(message) if digest_due else None
+                    deferred.setdefault((due, digest_key), []).append(message)
+
+            keys = sorted(deferred, key=lambda key: key[0])
+            finalize_key = None if send_now else (keys[0] if keys else None)
+            for key in keys:
+                item = {
+                    "notif": notif,
+                    "messages": deferred[key],
+                    "finalize": key == finalize_key,
+                }
+                if not self._schedule_delivery(key[0], item, key[1]):
+                    send_now.extend(deferred[key])
+
+            if send_now:
+                immediate.append((notif, send_now))
+            elif keys:
+                self.journal.record_outcome(notif["notification_id"], "scheduled")
+                self.logger.info(
+                    "⏰ Notification %s deferred until %s",
+                    notif["notification_id"],
+                    keys[0][0].strftime("%d/%m/%Y %H:%M"),
                 )
-                self.logger.error("❌ Notification %s completely failed: %s", notif_id, error_msg)
+        return immediate
 
-        except Exception as err:
-            self.patient_queries.update_notification_status(
-                notif_id, "failed", str(err)
+    def _schedule_delivery(self, due: datetime, item: dict, digest_key: str | None) -> bool:
+        if digest_key is None:
+            return self.scheduler.schedule_at(due, "deliver", {"items": [item]}) is not None
+        # Satu job digest per penerima per slot; item baru digabung ke job yang ada
+        dedupe_key = f"digest:{digest_key}:{int(due.timestamp())}"
+        job = self.scheduler.pending_job(dedupe_key)
+        if job is not None:
+            return self.scheduler.update_payload(
+                job, {**job.payload, "items": job.payload["items"] + [item]}
             )
-            self.logger.error(
-                "💥 Error processing notification %s: %s", notif_id, err
+        return self.scheduler.schedule_at(
+            due, "deliver", {"items": [item], "digest": True}, dedupe_key
+        ) is not None
+
+    def _schedule_reminder(self, notif: dict, messages: list, attempt: int):
+        # Pesan digest tidak punya tombol ack per notifikasi, jadi tidak bisa di-reminder
+        messages = [m for m in messages if not m.get("digested")]
+        due = self.send_policy.reminder_due(notif, datetime.now(), attempt)
+        if due is None or not messages:
+            return
+        self.scheduler.schedule_at(
+            due, "reminder", {"notif": notif, "messages": messages, "attempt": attempt}
+        )
+
+    def _run_delivery_job(self, payload: dict):
+        """Handler job ``deliver``: kirim pesan tertunda / digest.
+
+        Job digest (satu penerima per slot) dikirim sebagai satu pesan gabungan
+        bila berisi lebih dari satu pesan. Job baru selesai setelah semua
+        row-nya difinalisasi (future).
+        """
+        items = payload["items"]
+        final = [(i["notif"], i["messages"]) for i in items if i["finalize"]]
+        follow_up = [(i["notif"], i["messages"]) for i in items if not i["finalize"]]
+        self.logger.info("⏰ Delivering %s deferred notification items", len(items))
+        for notif, _ in final:
+            self.journal.record_attempt(notif["notification_id"])
+        if payload.get("digest") and sum(len(i["messages"]) for i in items) > 1:
+            return all_done(self._dispatch_digest(items))
+        return all_done(
+            self._dispatch(final)
+            + self._dispatch(follow_up, self._message_channels(), finalize=False)
+        )
+
+    def _run_reminder_job(self, payload: dict):
+        """Handler job ``reminder``: kirim ulang bila belum di-acknowledge"""
+        notif, attempt = payload["notif"], payload["attempt"]
+        notif_id = notif["notification_id"]
+        acknowledged = self.patient_queries.get_acknowledged_ids([notif_id])
+        if acknowledged is None:
+            raise RuntimeError("acknowledgement lookup failed")
+        if notif_id in acknowledged:
+            self.logger.info("✅ Notification %s acknowledged, reminder skipped", notif_id)
+            return
+
+        now = datetime.now()
+        quiet = [(m, self.send_policy.quiet_until(m, now)) for m in payload["messages"]]
+        ready = [m for m, until in quiet if until is None]
+        waiting = [(m, until) for m, until in quiet if until is not None]
+        if waiting:
+            self.scheduler.schedule_at(
+                max(until for _, until in waiting),
+                "reminder",
+                {"notif": notif, "messages": [m for m, _ in waiting], "attempt": attempt},
             )
+        if not ready:
+            return
+
+        self.logger.info(
+            "⏰ Reminder %s for notification %s (%s recipients)", attempt, notif_id, len(ready)
+        )
+        batch = [(notif, [{**m, "reminder": attempt} for m in ready])]
+        futures = self._dispatch(batch, self._ack_channels(), finalize=False)
+        self._schedule_reminder(notif, ready, attempt + 1)
+        return all_done(futures)
+
+    # ------------------------------------------------------------ #
+    # ASYNC MODE #
+    # ------------------------------------------------------------ #
+    async def process_notification_queue_async(self):
+        """Versi async: semua pesan penerima dalam satu batch dikirim paralel."""
+        tick_ok = True
+        try:
+            with self.tracer.span("tick", mode="async"):
+                self.logger.info("🔍 Checking notification queue (async)…")
+                await asyncio.to_thread(self.capture_inpatient_changes)
+                await asyncio.to_thread(self.drain_outbox)
+                await asyncio.to_thread(self.commit_journal)
+                await asyncio.to_thread(self.directory.refresh)
+                await asyncio.to_thread(self._adapt_batch)
+                batch = await asyncio.to_thread(self._dequeue_batch)
+                if not batch:
+                    return
+                batch = await asyncio.to_thread(self._apply_send_policies, batch)
+
+                notif_ids = [notif["notification_id"] for notif, _ in batch]
+                for notif, _ in batch:
+                    self.journal.record_attempt(notif["notification_id"])
+
+                messages = [m for _, msgs in batch for m in msgs]
+                targets = self._dispatch_targets(batch)
+                with self.tracer.span("send", notification_ids=notif_ids, messages=len(messages)):
+                    results = await asyncio.gather(*(
+                        self._timed_send_many(
+                            name, self.notifiers[name], [m for _, m in channel_targets]
+                        )
+                        for name, channel_targets in targets.items()
+                    ))
+                sent = {
+                    (id(key), name)
+                    for (name, channel_targets), channel_results in zip(targets.items(), results)
+                    for (key, _), ok in zip(channel_targets, channel_results)
+                    if ok
+                }
+
+                self._finalize_batch(batch, sent)
+                await asyncio.to_thread(self.commit_journal)
+                await asyncio.to_thread(self.flush_buffers)
+        except Exception as err:
+            tick_ok = False
+            self.logger.error("❌ Error processing queue: %s", err)
+        finally:
+            self.health.record_tick(tick_ok)
+
+    async def _timed_send_many(self, channel: str, notifier, targets: list) -> list:
+        """send_many + catat latency efektif per pesan untuk batch controller"""
+        started = time.monotonic()
+        results = await notifier.send_many(targets)
+        self._record_latency(channel, time.monotonic() - started, len(targets))
+        for ok in results:
+            self.circuits[channel].record(ok)
+        return results
+
+    async def _run_async_loop(self):
+        """Event loop async_mode: tick queue + job timer yang jatuh tempo"""
+        try:
+            while True:
+                next_tick = time.monotonic() + self._tick_interval()
+                await self.process_notification_queue_async()
+                await asyncio.to_thread(self.scheduler.run_pending)
+                while (remaining := next_tick - time.monotonic()) > 0:
+                    delay = self.scheduler.next_delay()
+                    await asyncio.sleep(remaining if delay is None else min(remaining, delay))
+                    await asyncio.to_thread(self.scheduler.run_pending)
+        finally:
+            for notifier in self.notifiers.values():
+                await notifier.aclose()
 
-    def _generate_error_message(self, notif: dict) -> str:
+    def _generate_error_message(self, message: dict) -> str:
         """Generate appropriate error message based on available contact methods"""
-        has_telegram = bool(notif.get("telegram_id"))
-        has_whatsapp = bool(notif.get("whatsapp_number"))
-
-        if not has_telegram and not has_whatsapp:
-            return "Doctor has no Telegram ID or WhatsApp number"
-        elif not has_telegram:
-            return "Doctor has no Telegram ID, WhatsApp send failed"
-        elif not has_whatsapp:
-            return "Doctor has no WhatsApp number, Telegram send failed"
-        else:
-            return "Failed to send via both Telegram and WhatsApp"
+        return ", ".join(
+            self.notifiers[name].missing_reason(message) or f"{name} send failed"
+            for name in self._message_channels()
+        )
+
+    def _skipped_contacts_message(self, message: dict) -> str:
+        skipped = message.get("skipped_contacts") or {}
+        if not skipped:
+            return ""
+        return " (skipped: " + ", ".join(f"{ch}: {r}" for ch, r in skipped.items()) + ")"
 
     # ------------------------------------------------------------ #
     def start_monitoring(self):
         """Start monitoring dengan connection test awal"""
         # Prevent double instance!
-        if os.path.exists(LOCK_FILE):
+        if os.path.exists(self.lock_file):
             print("⚠️ Sudah ada proses notifikasi berjalan. Hanya boleh satu instance!")
             sys.exit(1)
-        with open(LOCK_FILE, "w") as f:
+        with open(self.lock_file, "w") as f:
             f.write(str(os.getpid()))
         try:
             self.test_connections()
+            self.start_health_server()
+            if self.ack_consumer is not None:
+                self.ack_consumer.start()
+            self.directory.refresh(force=True)
+            self.drain_outbox()
+            self.commit_journal()
+            self._replay_orphan_journals()
+            self._drain_orphan_outboxes()
+            self.scheduler.load()
             interval = self.config.app.get("check_interval", 10)
             self.logger.info("🚀 Monitor started — interval %s s", interval)
-            # HANYA SEKALI schedule do
-            schedule.every(interval).seconds.do(self.process_notification_queue)
-            self.process_notification_queue()
+            if self.config.app.get("async_mode", False):
+                try:
+                    asyncio.run(self._run_async_loop())
+                except KeyboardInterrupt:
+                    self.logger.info("🛑 Stopped by user")
+                return
+            # Tick queue = job berulang di timer scheduler (interval adaptif)
+            self.scheduler.every(self._tick_interval, self.process_notification_queue)
             while True:
                 try:
-                    schedule.run_pending()
-                    time.sleep(1)
+                    self.scheduler.run_forever()
+                    break
                 except KeyboardInterrupt:
                     self.logger.info("🛑 Stopped by user")
                     break
@@ -184,19 +941,36 @@ class HospitalNotificationQueueMonitor:
                     self.logger.error("💥 Runtime error: %s", err)
                     time.sleep(5)
         finally:
+            if self.health_server is not None:
+                self.health_server.stop()
+            if self.ack_consumer is not None:
+                self.ack_consumer.stop()
+            for channel_queue in self.channel_queues.values():
+                channel_queue.stop()
+            # Row yang selesai saat shutdown tetap dapat outcome di journal
+            self._finalize_completed()
+            self.flush_buffers()
+            self.journal.close()
+            if self.outbox is not None:
+                self.outbox.close()
+            self.tracer.shutdown()
             # RELEASE LOCK FILE saat aplikasi shutdown
-            if os.path.exists(LOCK_FILE):
-                os.remove(LOCK_FILE)
+            if os.path.exists(self.lock_file):
+                os.remove(self.lock_file)
 
     def stop_monitoring(self):
         """Stop monitoring system"""
         self.logger.info("🛑 Stopping notification monitor...")
-        schedule.clear() # Clear all scheduled jobs
+        self.scheduler.stop()  # job persisten tetap di DB untuk restart berikutnya
 
 if __name__ == "__main__":
     try:
-        monitor = HospitalNotificationQueueMonitor()
-        monitor.start_monitoring()
+        sharding = Config().sharding
+        if sharding.get("workers", 1) > 1:
+            ShardSupervisor(sharding, LOCK_FILE).start()
+        else:
+            monitor = HospitalNotificationQueueMonitor()
+            monitor.start_monitoring()
     except KeyboardInterrupt:
         print("\n🛑 Application stopped by user")
     except Exception as e:
@@ -1,10 +1,91 @@
+import asyncio
 from abc import ABC, abstractmethod
+from typing import Dict, List
+
+try:
+    import aiohttp
+except ImportError:  # aiohttp opsional, fallback ke thread pool
+    aiohttp = None
+
 
 class BaseNotifier(ABC):
     """Base class for all notifiers"""
-    
+
+    channel = None
+    contact_field = None  # field pesan penerima yang wajib ada (None = selalu kirim)
+    contact_label = "contact"
+    counts_as_delivery = True  # False = sukses channel ini tidak membuat row berstatus sent
+    per_notification = False   # True = dikirim sekali per queue row, bukan per penerima
+    records_acks = False       # True = acknowledgement penerima tercatat (syarat reminder)
+    enabled = True
+    max_concurrency = 20
+    bad_recipient_callback = None
+    sent_message_callback = None
+
     @abstractmethod
     def send_patient_notification(self, patient: dict) -> bool:
         """Send patient notification"""
         pass
-    
+
+    def missing_reason(self, patient: dict) -> str | None:
+        """Alasan pesan tidak bisa dikirim lewat channel ini; None = bisa dikirim"""
+        if not self.enabled:
+            return f"{self.channel} disabled"
+        if self.contact_field and not patient.get(self.contact_field):
+            return f"no {self.contact_label}"
+        return None
+
+    @staticmethod
+    def _recipient_label(patient: dict) -> str:
+        """Nama penerima untuk log (DPJP atau staf bangsal hasil fan-out)"""
+        return patient.get("recipient_name") or patient.get("nm_dokter", "-")
+
+    def _report_bad_recipient(self, channel: str, value, reason: str):
+        """Laporkan penerima yang ditolak permanen (mis. ke negative cache direktori)"""
+        if self.bad_recipient_callback is not None:
+            self.bad_recipient_callback(channel, value, reason)
+
+    def _report_sent_message(self, patient: dict, chat_id, message_id):
+        """Laporkan ID pesan provider (untuk pelacakan acknowledgement)"""
+        if self.sent_message_callback is not None and message_id is not None:
+            self.sent_message_callback(patient, chat_id, message_id)
+
+    # ---------------------------------------------------------- #
+    # ASYNC TRANSPORT #
+    # ---------------------------------------------------------- #
+
+    async def send_patient_notification_async(self, patient: dict) -> bool:
+        """Versi async; default menjalankan jalur sync di thread pool."""
+        return await asyncio.to_thread(self.send_patient_notification, patient)
+
+    async def send_many(self, patients: List[Dict]) -> List[bool]:
+        """Kirim banyak notifikasi sekaligus, dibatasi max_concurrency."""
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def _send(patient):
+            async with semaphore:
+                try:
+                    return await self.send_patient_notification_async(patient)
+                except Exception as err:
+                    self.logger.error("❌ Async send error: %s", err)
+                    return False
+
+        return list(await asyncio.gather(*(_send(p) for p in patients)))
+
+    async def _get_session(self):
+        """Satu ClientSession per notifier, koneksi dibatasi connection_limit."""
+        session = getattr(self, "_session", None)
+        if session is None or session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=getattr(self, "connection_limit", 4)
+            )
+            session = aiohttp.ClientSession(connector=connector)
+            self._session = session
+        return session
+
+    async def aclose(self):
+        """Tutup ClientSession async (jika ada)"""
+        session = getattr(self, "_session", None)
+        if session is not None and not session.closed:
+            await session.close()
+        self._session = None
@@ -0,0 +1,175 @@
+import logging
+import re
+import time
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+TELEGRAM_ID_PATTERN = re.compile(r"^(-?\d{5,20}|@[A-Za-z0-9_]{5,32})$")
+WHATSAPP_NUMBER_PATTERN = re.compile(r"^0?8\d{7,12}$")
+
+
+@lru_cache(maxsize=4096)
+def normalize_phone_number(phone) -> str:
+    """Format nomor telepon ke format lokal 08xxx (hasil di-cache)"""
+    if not phone:
+        return ""
+
+    clean_phone = ''.join(filter(str.isdigit, str(phone)))
+
+    if clean_phone.startswith('0'):
+        return clean_phone  # Format: 085758779026
+    elif clean_phone.startswith('62'):
+        return clean_phone[2:]  # Convert 6285758779026 -> 085758779026
+    else:
+        return clean_phone
+
+
+@lru_cache(maxsize=4096)
+def validate_whatsapp(phone) -> Tuple[str | None, str | None]:
+    """Kembalikan (nomor ternormalisasi, None) atau (None, alasan invalid)"""
+    if not phone:
+        return None, "no WhatsApp number"
+    number = normalize_phone_number(phone)
+    if not WHATSAPP_NUMBER_PATTERN.match(number):
+        return None, f"invalid WhatsApp number {phone!r}"
+    return number, None
+
+
+@lru_cache(maxsize=4096)
+def validate_telegram(chat_id) -> Tuple[str | None, str | None]:
+    """Kembalikan (chat_id, None) atau (None, alasan invalid)"""
+    if not chat_id:
+        return None, "no Telegram ID"
+    value = str(chat_id).strip()
+    if not TELEGRAM_ID_PATTERN.match(value):
+        return None, f"invalid Telegram ID {chat_id!r}"
+    return value, None
+
+
+class RecipientDirectory:
+    """Direktori kontak dokter yang sudah dinormalisasi dan divalidasi.
+
+    Dibangun saat startup dari tabel ``dokter`` dan di-refresh berkala; hanya
+    baris yang kontaknya berubah yang divalidasi ulang (sekaligus mengisi
+    cache normalisasi). Kontak yang invalid atau ditolak provider (negative
+    cache) dilewati tanpa HTTP round-trip.
+    """
+
+    def __init__(self, patient_queries, config: dict | None = None):
+        config = config or {}
+        self.patient_queries = patient_queries
+        self.refresh_seconds = config.get("refresh_seconds", 300)
+        self.negative_ttl = config.get("negative_ttl_seconds", 86400)
+        self.logger = logging.getLogger(__name__)
+        self._entries: Dict[str, Dict] = {}
+        self._negative: Dict[Tuple[str, str], Tuple[str, float]] = {}
+        self._refreshed_at = 0.0
+        self._last_report = ""
+
+    # ---------------------------------------------------------- #
+    def refresh(self, force: bool = False):
+        """Muat ulang kontak dokter; validasi hanya baris yang berubah"""
+        if not force and time.monotonic() - self._refreshed_at < self.refresh_seconds:
+            return
+        rows = self.patient_queries.get_doctor_contacts()
+        if rows is None:
+            return
+        self._refreshed_at = time.monotonic()
+
+        for row in rows:
+            raw = (row.get("telegram_id"), row.get("whatsapp_number"))
+            entry = self._entries.get(row["kd_dokter"])
+            if entry is not None and entry["raw"] == raw:
+                continue
+            self._entries[row["kd_dokter"]] = self._build_entry(row, raw)
+
+        self.logger.info("📊 Recipient directory loaded: %s doctors", len(self._entries))
+        self._log_report()
+
+    def _log_report(self):
+        """Log dokter dengan kontak tak terpakai, hanya bila daftarnya berubah"""
+        bad = self.report()
+        summary = "; ".join(
+            f"{e['nm_dokter']} ({', '.join(e['reasons'].values())})" for e in bad
+        )
+        if summary and summary != self._last_report:
+            self.logger.warning("⚠️ %s doctors with unusable contacts: %s", len(bad), summary)
+        self._last_report = summary
+
+    @staticmethod
+    def _build_entry(row: dict, raw: tuple) -> dict:
+        telegram_id, telegram_error = validate_telegram(raw[0])
+        whatsapp_number, whatsapp_error = validate_whatsapp(raw[1])
+        invalid = {}
+        # Kontak kosong bukan "invalid", hanya tidak tersedia
+        if raw[0] and telegram_error:
+            invalid["telegram"] = telegram_error
+        if raw[1] and whatsapp_error:
+            invalid["whatsapp"] = whatsapp_error
+        return {
+            "nm_dokter": row.get("nm_dokter"),
+            "raw": raw,
+            "telegram_id": telegram_id,
+            "whatsapp_number": whatsapp_number,
+            "invalid": invalid,
+        }
+
+    # ---------------------------------------------------------- #
+    def mark_bad(self, channel: str, value, reason: str):
+        """Negative cache: kontak yang ditolak provider secara permanen"""
+        key = (channel, str(value))
+        if key not in self._negative:
+            self.logger.warning("⚠️ Marking %s recipient %s as bad: %s", channel, value, reason)
+        self._negative[key] = (reason, time.monotonic() + self.negative_ttl)
+
+    def _negative_reason(self, channel: str, value) -> str | None:
+        cached = self._negative.get((channel, str(value)))
+        if cached is None:
+            return None
+        reason, expires_at = cached
+        if time.monotonic() >= expires_at:
+            del self._negative[(channel, str(value))]
+            return None
+        return reason
+
+    def clean(self, recipient: dict) -> dict:
+        """Ganti kontak penerima dengan versi ternormalisasi; kontak buruk di-skip"""
+        raw = (recipient.get("telegram_id"), recipient.get("whatsapp_number"))
+        entry = self._entries.get(recipient.get("kd_dokter"))
+        if entry is None or entry["raw"] != raw:
+            # Bukan dokter / data lebih baru dari refresh terakhir: validasi
+            # dari nilai mentah (lru_cache), jadi selalu sesuai data terbaru
+            entry = self._build_entry(recipient, raw)
+        contacts = {
+            "telegram": (entry["telegram_id"], entry["invalid"].get("telegram")),
+            "whatsapp": (entry["whatsapp_number"], entry["invalid"].get("whatsapp")),
+            "email": (recipient.get("email") or None, None),
+        }
+
+        skipped = {}
+        for channel, (value, error) in contacts.items():
+            reason = error or (value and self._negative_reason(channel, value))
+            if reason:
+                skipped[channel] = reason
+                contacts[channel] = (None, reason)
+
+        return {
+            **recipient,
+            "telegram_id": contacts["telegram"][0],
+            "whatsapp_number": contacts["whatsapp"][0],
+            "email": contacts["email"][0],
+            "skipped_contacts": skipped,
+        }
+
+    def report(self) -> List[Dict]:
+        """Semua dokter dengan kontak invalid atau di negative cache"""
+        bad = []
+        for kd_dokter, entry in self._entries.items():
+            reasons = dict(entry["invalid"])
+            for channel, value in (("telegram", entry["telegram_id"]), ("whatsapp", entry["whatsapp_number"])):
+                reason = value and self._negative_reason(channel, value)
+                if reason:
+                    reasons[channel] = reason
+            if reasons:
+                bad.append({"kd_dokter": kd_dokter, "nm_dokter": entry["nm_dokter"], "reasons": reasons})
+        return bad
@@ -0,0 +1,131 @@
+import logging
+import smtplib
+from datetime import datetime
+from email.message import EmailMessage
+from .base import BaseNotifier
+from utils.tracing import get_tracer
+
+
+class EmailNotifier(BaseNotifier):
+    channel = "email"
+    contact_field = "email"
+    contact_label = "email address"
+
+    def __init__(self, config):
+        super().__init__()
+        self.smtp_host = config.get("smtp_host")
+        self.smtp_port = config.get("smtp_port", 587)
+        self.username = config.get("username")
+        self.password = config.get("password")
+        self.use_tls = config.get("use_tls", True)
+        self.sender = config.get("sender") or self.username
+        self.enabled = config.get("enabled", True)
+        self.timeout = config.get("timeout", 15)
+        self.max_concurrency = config.get("max_concurrency", 4)
+        self.logger = logging.getLogger(__name__)
+
+        if not (self.smtp_host and self.sender):
+            self.logger.warning("⚠️ Email SMTP not configured")
+            self.enabled = False
+
+    # ---------------------------------------------------------- #
+    def _build_message(self, patient: dict) -> EmailMessage:
+        with get_tracer().span(
+            "render", channel="email", notification_id=patient.get("notification_id")
+        ):
+            body = self._format_message(patient)
+
+        message = EmailMessage()
+        message["From"] = self.sender
+        message["To"] = patient["email"]
+        if patient.get("digest"):
+            message["Subject"] = f"Ringkasan Pasien Rawat Inap ({len(patient['digest'])} pasien)"
+        else:
+            message["Subject"] = f"Pasien Rawat Inap: {patient['nm_pasien']} ({patient['no_rawat']})"
+        message.set_content(body)
+        return message
+
+    def send_patient_notification(self, patient: dict) -> bool:
+        if not self.enabled:
+            return False
+        if not patient.get("email"):
+            self.logger.warning("⚠️ %s has no email address", self._recipient_label(patient))
+            return False
+
+        message = self._build_message(patient)
+        try:
+            self.logger.info("📤 Sending email to %s", patient["email"])
+            with smtplib.SMTP(self.smtp_host, self.smtp_port, timeout=self.timeout) as smtp:
+                if self.use_tls:
+                    smtp.starttls()
+                if self.username:
+                    smtp.login(self.username, self.password)
+                refused = smtp.send_message(message)
+            if refused:
+                self._report_bad_recipient("email", patient["email"], str(refused))
+                return False
+            self.logger.info(
+                "✅ Email sent to %s — Patient: %s",
+                self._recipient_label(patient),
+                patient["nm_pasien"],
+            )
+            return True
+        except smtplib.SMTPRecipientsRefused as err:
+            self._report_bad_recipient("email", patient["email"], str(err.recipients))
+            self.logger.error("❌ Email refused for %s: %s", self._recipient_label(patient), err)
+            return False
+        except (smtplib.SMTPException, OSError) as err:
+            self.logger.error("❌ Email failed for %s: %s", self._recipient_label(patient), err)
+            return False
+
+    # ---------------------------------------------------------- #
+    def _format_message(self, patient: dict) -> str:
+        if patient.get("digest"):
+            return self._format_digest(patient)
+        notif_type = patient.get("notification_type", "new_patient_dpjp")
+        if notif_type == "dpjp_changed":
+            header = "PERUBAHAN DPJP PASIEN RAWAT INAP"
+        else:
+            header = "PASIEN BARU RAWAT INAP - DPJP ASSIGNED"
+        if patient.get("reminder"):
+            header = f"PENGINGAT #{patient['reminder']} - BELUM DIKONFIRMASI\n{header}"
+
+        return (
+            f"{header}\n\n"
+            f"DPJP: {patient['nm_dokter']}\n\n"
+            f"Nama Pasien: {patient['nm_pasien']}\n"
+            f"Jenis Kelamin: {patient['jenis_kelamin']}\n"
+            f"No. Rawat: {patient['no_rawat']}\n"
+            f"No. Rekam Medis: {patient['no_rkm_medis']}\n\n"
+            f"Kamar: {patient['kd_kamar']}\n"
+            f"Bangsal: {patient['nm_bangsal']} (Kode: {patient['kd_bangsal']})\n\n"
+            f"Tanggal Masuk: {patient['tgl_masuk'].strftime('%d/%m/%Y %H:%M WIB')}\n"
+            f"Diagnosa Awal: {patient['diagnosa_awal']}\n\n"
+            f"Notifikasi: {datetime.now().strftime('%d/%m/%Y %H:%M WIB')}"
+        )
+
+    def _format_digest(self, patient: dict) -> str:
+        """Satu email ringkasan untuk semua notifikasi digest penerima ini"""
+        items = patient["digest"]
+        lines = [f"RINGKASAN PASIEN RAWAT INAP ({len(items)})"]
+        for number, item in enumerate(items, 1):
+            lines.append(
+                f"\n{number}. {item['nm_pasien']} ({item['jenis_kelamin']})\n"
+                f"   No. Rawat: {item['no_rawat']} / No. RM: {item['no_rkm_medis']}\n"
+                f"   Kamar: {item['kd_kamar']} - {item['nm_bangsal']}\n"
+                f"   DPJP: {item['nm_dokter']}\n"
+                f"   Tanggal Masuk: {item['tgl_masuk'].strftime('%d/%m/%Y %H:%M WIB')}\n"
+                f"   Diagnosa Awal: {item['diagnosa_awal']}"
+            )
+        lines.append(f"\nNotifikasi: {datetime.now().strftime('%d/%m/%Y %H:%M WIB')}")
+        return "\n".join(lines)
+
+    # ---------------------------------------------------------- #
+    def test_connection(self) -> bool:
+        try:
+            with smtplib.SMTP(self.smtp_host, self.smtp_port, timeout=5) as smtp:
+                smtp.noop()
+            return True
+        except Exception as err:
+            self.logger.error("❌ Email connection test failed: %s", err)
+            return False
@@ -0,0 +1,95 @@
+import logging
+from typing import Dict, List, Tuple
+
+
+class RecipientFanOut:
+    """Resolve semua penerima untuk satu row notification_queue.
+
+    Penerima = semua DPJP pasien (``dpjp_ranap``) + staf bangsal yang
+    terdaftar di ``ward_subscriptions`` per ``kd_bangsal`` (key ``"*"``
+    berlaku untuk semua bangsal). Hasilnya satu pesan per penerima, masing-
+    masing membawa ``telegram_id`` / ``whatsapp_number`` / ``email`` penerima tersebut.
+    """
+
+    def __init__(self, patient_queries, ward_subscriptions: dict | None = None, directory=None):
+        self.patient_queries = patient_queries
+        self.ward_subscriptions = ward_subscriptions or {}
+        self.directory = directory
+        self.logger = logging.getLogger(__name__)
+
+    def expand(self, notifications: List[Dict]) -> List[Tuple[Dict, List[Dict]]]:
+        """Kembalikan pasangan (row queue, [pesan per penerima])"""
+        if not notifications:
+            return []
+
+        dpjp_map = self.patient_queries.get_dpjp_recipients(
+            list({n["no_rawat"] for n in notifications})
+        )
+        if dpjp_map is None:
+            # Jangan tandai failed hanya karena lookup penerima gagal; coba tick berikutnya
+            self.logger.warning("⚠️ Recipient lookup failed, batch postponed")
+            return []
+
+        batch = []
+        for notif in notifications:
+            dpjp = dpjp_map.get(notif["no_rawat"], [])
+            dpjp_names = ", ".join(d["nm_dokter"] for d in dpjp) or "-"
+
+            recipients = [
+                {
+                    "recipient_name": d["nm_dokter"],
+                    "recipient_role": "dpjp",
+                    "kd_dokter": d.get("kd_dokter"),
+                    "telegram_id": d.get("telegram_id"),
+                    "whatsapp_number": d.get("whatsapp_number"),
+                    "email": d.get("email"),
+                }
+                for d in dpjp
+            ]
+            recipients += [
+                {
+                    "recipient_name": sub.get("name", "Staf bangsal"),
+                    "recipient_role": sub.get("role", "ward_staff"),
+                    "kd_dokter": None,
+                    "telegram_id": sub.get("telegram_id"),
+                    "whatsapp_number": sub.get("whatsapp_number"),
+                    "email": sub.get("email"),
+                }
+                for sub in self._ward_subscribers(notif.get("kd_bangsal"))
+            ]
+
+            if self.directory is not None:
+                recipients = [self.directory.clean(r) for r in recipients]
+            messages = [
+                {**notif, "nm_dokter": dpjp_names, **recipient}
+                for recipient in self._dedupe(recipients)
+            ]
+            batch.append((notif, messages))
+
+        total = sum(len(messages) for _, messages in batch)
+        self.logger.info(
+            "📊 Fan-out: %s queue rows -> %s recipient messages", len(batch), total
+        )
+        return batch
+
+    def _ward_subscribers(self, kd_bangsal) -> List[Dict]:
+        return list(self.ward_subscriptions.get("*", [])) + list(
+            self.ward_subscriptions.get(kd_bangsal, []) if kd_bangsal else []
+        )
+
+    @staticmethod
+    def _dedupe(recipients: List[Dict]) -> List[Dict]:
+        """Satu kontak hanya menerima satu pesan per row (mis. DPJP juga subscriber)"""
+        seen = set()
+        unique = []
+        for recipient in recipients:
+            key = (
+                recipient.get("telegram_id") or None,
+                recipient.get("whatsapp_number") or None,
+                recipient.get("email") or None,
+            )
+            if key != (None, None, None) and key in seen:
+                continue
+            seen.add(key)
+            unique.append(recipient)
+        return unique
@@ -0,0 +1,36 @@
+import logging
+from typing import Dict, Type
+from .base import BaseNotifier
+from .email import EmailNotifier
+from .telegram import TelegramNotifier
+from .webhook import WebhookNotifier
+from .whatsapp import WhatsAppNotifier
+
+# Channel bawaan yang selalu dibuat (perilaku lama); channel lain hanya jika
+# section config-nya ada dan ``enabled: true``.
+DEFAULT_CHANNELS = ("telegram", "whatsapp")
+
+NOTIFIER_TYPES: Dict[str, Type[BaseNotifier]] = {
+    "telegram": TelegramNotifier,
+    "whatsapp": WhatsAppNotifier,
+    "email": EmailNotifier,
+    "webhook": WebhookNotifier,
+}
+
+
+def register_notifier(name: str, notifier_cls: Type[BaseNotifier]):
+    """Daftarkan channel baru; dispatch loop tidak perlu diubah"""
+    NOTIFIER_TYPES[name] = notifier_cls
+
+
+def build_notifiers(config) -> Dict[str, BaseNotifier]:
+    """Buat instance notifier untuk setiap channel yang aktif di config"""
+    logger = logging.getLogger(__name__)
+    notifiers = {}
+    for name, notifier_cls in NOTIFIER_TYPES.items():
+        channel_config = config.channel(name)
+        if name not in DEFAULT_CHANNELS and not channel_config.get("enabled", False):
+            continue
+        notifiers[name] = notifier_cls(channel_config)
+    logger.info("📡 Notification channels: %s", ", ".join(notifiers))
+    return notifiers
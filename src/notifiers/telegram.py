@@ -1,46 +1,139 @@
+import asyncio
+import json
 import requests
 import logging
 from datetime import datetime
-from .base import BaseNotifier
+from .base import BaseNotifier, aiohttp
+from utils.tracing import get_tracer
 
 
 class TelegramNotifier(BaseNotifier):
+    channel = "telegram"
+    contact_field = "telegram_id"
+    contact_label = "Telegram ID"
+
     def __init__(self, config):
         super().__init__()
         self.token = config.get("bot_token")
-        self.api_url = f"https://api.telegram.org/bot{self.token}/sendMessage"
+        self.enabled = config.get("enabled", True)
+        # api_base bisa diarahkan ke stub lokal (scripts/telegram_stub_server.py)
+        self.api_base = config.get("api_base", "https://api.telegram.org").rstrip("/")
+        self.api_url = f"{self.api_base}/bot{self.token}/sendMessage"
+        acknowledgements = config.get("acknowledgements") or {}
+        self.records_acks = acknowledgements.get("enabled", False)
+        self.ack_button = self.records_acks and acknowledgements.get("button", True)
+        self.timeout = config.get("timeout", 10)
+        self.max_concurrency = config.get("max_concurrency", 20)
+        self.connection_limit = config.get("connection_limit", 4)
         self.logger = logging.getLogger(__name__)
 
     # ---------------------------------------------------------- #
-    def send_patient_notification(self, patient: dict) -> bool:
+    def _build_payload(self, patient: dict) -> dict | None:
         if not patient.get("telegram_id"):
-            self.logger.warning("⚠️ Doctor %s has no Telegram ID", patient["nm_dokter"])
-            return False
+            self.logger.warning("⚠️ %s has no Telegram ID", self._recipient_label(patient))
+            return None
+
+        with get_tracer().span(
+            "render", channel="telegram", notification_id=patient.get("notification_id")
+        ):
+            text = self._format_message(patient)
 
         payload = {
             "chat_id": patient["telegram_id"],
-            "text": self._format_message(patient),
+            "text": text,
             "parse_mode": "Markdown",
         }
+        if self.ack_button and patient.get("notification_id"):
+            payload["reply_markup"] = {
+                "inline_keyboard": [[{
+                    "text": "✅ Sudah dibaca",
+                    "callback_data": f"ack:{patient['notification_id']}",
+                }]]
+            }
+        return payload
+
+    # ---------------------------------------------------------- #
+    def send_patient_notification(self, patient: dict) -> bool:
+        payload = self._build_payload(patient)
+        if payload is None:
+            return False
 
         try:
             self.logger.info("📤 Sending to chat_id %s", patient["telegram_id"])
-            response = requests.post(self.api_url, json=payload, timeout=10)
+            response = requests.post(self.api_url, json=payload, timeout=self.timeout)
             response.raise_for_status()
+            self._report_sent_message(
+                patient, patient["telegram_id"], self._message_id(response.text)
+            )
             self.logger.info(
-                "✅ Telegram sent to Dr. %s — Patient: %s",
-                patient["nm_dokter"],
+                "✅ Telegram sent to %s — Patient: %s",
+                self._recipient_label(patient),
                 patient["nm_pasien"],
             )
             return True
         except requests.exceptions.RequestException as err:
+            if err.response is not None:
+                self._check_bad_recipient(
+                    patient["telegram_id"], err.response.status_code, err.response.text
+                )
+            self.logger.error(
+                "❌ Telegram failed for %s: %s", self._recipient_label(patient), err
+            )
+            return False
+
+    # ---------------------------------------------------------- #
+    async def send_patient_notification_async(self, patient: dict) -> bool:
+        if aiohttp is None:
+            return await super().send_patient_notification_async(patient)
+
+        payload = self._build_payload(patient)
+        if payload is None:
+            return False
+
+        try:
+            session = await self._get_session()
+            async with session.post(
+                self.api_url,
+                json=payload,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            ) as response:
+                if response.status >= 400:
+                    self._check_bad_recipient(
+                        patient["telegram_id"], response.status, await response.text()
+                    )
+                response.raise_for_status()
+                body = await response.text()
+            self._report_sent_message(patient, patient["telegram_id"], self._message_id(body))
+            self.logger.info(
+                "✅ Telegram sent to %s — Patient: %s",
+                self._recipient_label(patient),
+                patient["nm_pasien"],
+            )
+            return True
+        except (aiohttp.ClientError, asyncio.TimeoutError) as err:
             self.logger.error(
-                "❌ Telegram failed for Dr. %s: %s", patient["nm_dokter"], err
+                "❌ Telegram failed for %s: %s", self._recipient_label(patient), err
             )
             return False
 
+    # ---------------------------------------------------------- #
+    @staticmethod
+    def _message_id(body: str) -> int | None:
+        """message_id dari response sendMessage (None bila tidak terbaca)"""
+        try:
+            return json.loads(body)["result"]["message_id"]
+        except (ValueError, KeyError, TypeError):
+            return None
+
+    def _check_bad_recipient(self, chat_id, status_code: int, body: str):
+        """403 (bot diblokir) atau 400 chat not found = penerima buruk permanen"""
+        if status_code == 403 or (status_code == 400 and "chat not found" in body.lower()):
+            self._report_bad_recipient("telegram", chat_id, f"HTTP {status_code}: {body[:200]}")
+
     # ---------------------------------------------------------- #
     def _format_message(self, patient: dict) -> str:
+        if patient.get("digest"):
+            return self._format_digest(patient)
         notif_type = patient.get("notification_type", "new_patient_dpjp")
         if notif_type == "new_patient_dpjp":
             header = "🏥 *PASIEN BARU RAWAT INAP - DPJP ASSIGNED*"
@@ -48,6 +141,8 @@ class TelegramNotifier(BaseNotifier):
             header = "🔄 *PERUBAHAN DPJP PASIEN RAWAT INAP*"
         else:
             header = "🏥 *NOTIFIKASI PASIEN RAWAT INAP*"
+        if patient.get("reminder"):
+            header = f"⏰ *PENGINGAT #{patient['reminder']} - BELUM DIKONFIRMASI*\n{header}"
 
         return (
             f"{header}\n\n"
@@ -63,10 +158,26 @@ class TelegramNotifier(BaseNotifier):
             f"⏰ Notifikasi: {datetime.now().strftime('%d/%m/%Y %H:%M WIB')}"
         )
 
+    def _format_digest(self, patient: dict) -> str:
+        """Satu pesan ringkasan untuk semua notifikasi digest penerima ini"""
+        items = patient["digest"]
+        lines = [f"🗂️ *RINGKASAN PASIEN RAWAT INAP ({len(items)})*"]
+        for number, item in enumerate(items, 1):
+            lines.append(
+                f"\n{number}. 👤 *{item['nm_pasien']}* ({item['jenis_kelamin']})\n"
+                f"📋 {item['no_rawat']} / RM {item['no_rkm_medis']}\n"
+                f"🏠 {item['kd_kamar']} - {item['nm_bangsal']}\n"
+                f"👨‍⚕️ DPJP: {item['nm_dokter']}\n"
+                f"📅 {item['tgl_masuk'].strftime('%d/%m/%Y %H:%M WIB')}\n"
+                f"🩺 {item['diagnosa_awal']}"
+            )
+        lines.append(f"\n⏰ Notifikasi: {datetime.now().strftime('%d/%m/%Y %H:%M WIB')}")
+        return "\n".join(lines)
+
     # ---------------------------------------------------------- #
     def test_connection(self) -> bool:
         try:
-            url = f"https://api.telegram.org/bot{self.token}/getMe"
+            url = f"{self.api_base}/bot{self.token}/getMe"
             response = requests.get(url, timeout=5)
             response.raise_for_status()
             return True
@@ -0,0 +1,228 @@
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+import requests
+
+ACK_CALLBACK_PREFIX = "ack:"
+
+
+class TelegramMessageLog:
+    """Buffer message_id Telegram yang terkirim, ditulis bulk ke DB tiap tick.
+
+    Dipasang sebagai ``sent_message_callback`` TelegramNotifier; aman
+    dipanggil dari worker channel maupun event loop async.
+    """
+
+    def __init__(self, patient_queries):
+        self.patient_queries = patient_queries
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._rows: List[Tuple[str, int, int, str | None]] = []
+
+    def record(self, patient: dict, chat_id, message_id: int):
+        if not patient.get("notification_id"):
+            return
+        with self._lock:
+            self._rows.append(
+                (str(chat_id), int(message_id), patient["notification_id"], patient.get("kd_dokter"))
+            )
+
+    def flush(self) -> bool:
+        with self._lock:
+            rows, self._rows = self._rows, []
+        if not rows:
+            return True
+        if self.patient_queries.record_telegram_messages(rows):
+            return True
+        with self._lock:
+            self._rows = rows + self._rows
+        return False
+
+
+class TelegramAckConsumer:
+    """Consumer long-poll ``getUpdates`` untuk acknowledgement dokter.
+
+    Ack berasal dari tombol inline (``callback_data = "ack:<id>"``) atau
+    balasan (reply) ke pesan notifikasi. Update diproses per batch; ack
+    ditulis bulk ke ``notification_queue`` lalu ``offset`` dimajukan. Bila
+    penulisan DB gagal, offset tidak dimajukan sehingga Telegram mengirim
+    ulang update yang sama di poll berikutnya. Update untuk pesan yang belum
+    tercatat (message_id shard lain belum ditulis) ditahan paling lama
+    ``unresolved_retry_seconds`` sebelum dibuang.
+    """
+
+    def __init__(self, notifier, patient_queries, message_log: TelegramMessageLog | None = None,
+                 config: dict | None = None):
+        config = config or {}
+        self.logger = logging.getLogger(__name__)
+        self.patient_queries = patient_queries
+        self.message_log = message_log
+        self.base_url = f"{notifier.api_base}/bot{notifier.token}"
+        self.poll_timeout = config.get("poll_timeout", 30)
+        self.batch_limit = config.get("batch_limit", 100)
+        self.error_backoff = config.get("error_backoff_seconds", 5)
+        # Reply/tombol untuk message_id yang belum ada di DB ditahan sementara
+        self.unresolved_retry = config.get("unresolved_retry_seconds", 120)
+        self.unresolved_backoff = config.get("unresolved_backoff_seconds", 2)
+        self.offset = None
+        self._unresolved_since: Dict[int, float] = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    # ---------------------------------------------------------- #
+    def _get_updates(self) -> List[Dict]:
+        params = {
+            "timeout": self.poll_timeout,
+            "limit": self.batch_limit,
+            "allowed_updates": '["message","callback_query"]',
+        }
+        if self.offset is not None:
+            params["offset"] = self.offset
+        response = requests.get(
+            f"{self.base_url}/getUpdates", params=params, timeout=self.poll_timeout + 10
+        )
+        response.raise_for_status()
+        return response.json().get("result", [])
+
+    @staticmethod
+    def _actor(user: dict | None) -> str:
+        user = user or {}
+        return str(user.get("username") or user.get("id") or "telegram")[:100]
+
+    def _collect_acks(self, updates: List[Dict]) -> Tuple[List, List, set] | None:
+        """Ubah batch update jadi acks, callback dan update yang belum ter-resolve.
+
+        Tombol dan reply sama-sama di-resolve lewat pesan yang benar-benar
+        dikirim bot (chat_id, message_id); ``ack:<id>`` hanya diterima bila
+        cocok dengan notifikasi pesan tersebut. Mengembalikan
+        ``([(notification_id, waktu, oleh)], [(update_id, callback_id)],
+        {update_id pesan yang belum dikenal})`` atau None bila lookup gagal.
+        """
+        acks = {}
+        callbacks = []
+        lookups = []
+        for update in updates:
+            callback = update.get("callback_query")
+            if callback:
+                callbacks.append((update["update_id"], callback["id"]))
+                data = callback.get("data") or ""
+                message = callback.get("message")
+                if not (data.startswith(ACK_CALLBACK_PREFIX) and data[len(ACK_CALLBACK_PREFIX):].isdigit()):
+                    continue
+                if not message:
+                    self.logger.warning("⚠️ Ignoring ack callback without message: %s", data)
+                    continue
+                lookups.append((
+                    update["update_id"],
+                    (str(message["chat"]["id"]), int(message["message_id"])),
+                    int(data[len(ACK_CALLBACK_PREFIX):]),
+                    datetime.now(),
+                    self._actor(callback.get("from")),
+                ))
+                continue
+
+            message = update.get("message") or {}
+            replied = message.get("reply_to_message")
+            if replied:
+                lookups.append((
+                    update["update_id"],
+                    (str(message["chat"]["id"]), int(replied["message_id"])),
+                    None,
+                    datetime.fromtimestamp(message.get("date", datetime.now().timestamp())),
+                    self._actor(message.get("from")),
+                ))
+
+        unresolved = set()
+        if not lookups:
+            return list(acks.values()), callbacks, unresolved
+        # Pastikan message_id yang baru terkirim sudah ada di DB
+        if self.message_log is not None and not self.message_log.flush():
+            return None
+        resolved = self.patient_queries.get_notifications_by_telegram_message(
+            list({pair for _, pair, _, _, _ in lookups})
+        )
+        if resolved is None:
+            return None
+        for update_id, pair, claimed, acked_at, actor in lookups:
+            nid = resolved.get(pair)
+            if nid is None:
+                # Shard lain mungkin belum menulis message_id-nya: coba lagi
+                unresolved.add(update_id)
+            elif claimed is not None and claimed != nid:
+                self.logger.warning(
+                    "⚠️ Ignoring ack from %s: message %s belongs to %s, not %s",
+                    actor, pair, nid, claimed,
+                )
+            else:
+                acks.setdefault(nid, (nid, acked_at, actor))
+        return list(acks.values()), callbacks, unresolved
+
+    def _answer_callbacks(self, callback_ids: List[str]):
+        for callback_id in callback_ids:
+            try:
+                requests.post(
+                    f"{self.base_url}/answerCallbackQuery",
+                    json={"callback_query_id": callback_id, "text": "Terima kasih, sudah dicatat"},
+                    timeout=5,
+                )
+            except requests.exceptions.RequestException as err:
+                self.logger.warning("⚠️ answerCallbackQuery failed: %s", err)
+
+    def _next_offset(self, updates: List[Dict], unresolved: set) -> int:
+        """Offset berikutnya; berhenti di update yang masih boleh dicoba ulang"""
+        now = time.monotonic()
+        for update_id in sorted(unresolved):
+            since = self._unresolved_since.setdefault(update_id, now)
+            if now - since < self.unresolved_retry:
+                return update_id
+            self.logger.warning(
+                "⚠️ Dropping Telegram update %s: message not found after %ss",
+                update_id, self.unresolved_retry,
+            )
+        return updates[-1]["update_id"] + 1
+
+    def poll_once(self) -> int:
+        """Satu siklus getUpdates; kembalikan jumlah ack yang ditulis"""
+        updates = self._get_updates()
+        if not updates:
+            return 0
+        collected = self._collect_acks(updates)
+        if collected is None:
+            return 0
+        acks, callbacks, unresolved = collected
+        if acks and not self.patient_queries.acknowledge_notifications(acks):
+            return 0
+        self.offset = self._next_offset(updates, unresolved)
+        self._unresolved_since = {
+            uid: since for uid, since in self._unresolved_since.items() if uid >= self.offset
+        }
+        self._answer_callbacks([cid for uid, cid in callbacks if uid < self.offset])
+        if self.offset <= updates[-1]["update_id"]:
+            # Update ditahan: beri waktu shard lain menulis message_id
+            self._stop.wait(self.unresolved_backoff)
+        if acks:
+            self.logger.info(
+                "✅ Recorded %s Telegram acknowledgements: %s", len(acks), [a[0] for a in acks]
+            )
+        return len(acks)
+
+    # ---------------------------------------------------------- #
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.poll_once()
+            except Exception as err:
+                self.logger.error("❌ Telegram update polling failed: %s", err)
+                self._stop.wait(self.error_backoff)
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="telegram-ack", daemon=True)
+        self._thread.start()
+        self.logger.info("✅ Telegram acknowledgement consumer started")
+
+    def stop(self):
+        self._stop.set()
@@ -0,0 +1,76 @@
+import requests
+import logging
+from datetime import date, datetime
+from .base import BaseNotifier
+
+
+def _json_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+class WebhookNotifier(BaseNotifier):
+    """POST JSON notifikasi ke endpoint eksternal (mis. dashboard / integrasi lain).
+
+    Tidak butuh kontak per penerima: dikirim sekali per queue row ke ``url``
+    yang sama, dengan semua penerima hasil fan-out di field ``recipients``.
+    Bukan pengiriman ke dokter, jadi tidak menentukan status row.
+    """
+
+    channel = "webhook"
+    contact_field = None
+    counts_as_delivery = False
+    per_notification = True
+
+    FIELDS = (
+        "notification_id", "notification_type", "no_rawat", "no_rkm_medis",
+        "nm_pasien", "jenis_kelamin", "kd_kamar", "kd_bangsal", "nm_bangsal",
+        "tgl_masuk", "diagnosa_awal",
+    )
+    RECIPIENT_FIELDS = ("recipient_name", "recipient_role", "kd_dokter", "nm_dokter")
+
+    def __init__(self, config):
+        super().__init__()
+        self.url = config.get("url")
+        self.headers = config.get("headers", {})
+        self.enabled = config.get("enabled", True)
+        self.timeout = config.get("timeout", 10)
+        self.max_concurrency = config.get("max_concurrency", 4)
+        self.logger = logging.getLogger(__name__)
+
+        if not self.url:
+            self.logger.warning("⚠️ Webhook URL not configured")
+            self.enabled = False
+
+    def _build_payload(self, notification: dict) -> dict:
+        payload = {field: _json_value(notification.get(field)) for field in self.FIELDS}
+        payload["recipients"] = [
+            {field: recipient.get(field) for field in self.RECIPIENT_FIELDS}
+            for recipient in notification.get("recipients", [])
+        ]
+        return payload
+
+    def send_patient_notification(self, patient: dict) -> bool:
+        """``patient`` = data queue row + ``recipients``"""
+        if not self.enabled:
+            return False
+        try:
+            response = requests.post(
+                self.url,
+                json=self._build_payload(patient),
+                headers=self.headers,
+                timeout=self.timeout,
+            )
+            response.raise_for_status()
+            self.logger.info(
+                "✅ Webhook sent for notification %s — Patient: %s",
+                patient.get("notification_id"),
+                patient["nm_pasien"],
+            )
+            return True
+        except requests.exceptions.RequestException as err:
+            self.logger.error(
+                "❌ Webhook failed for notification %s: %s", patient.get("notification_id"), err
+            )
+            return False
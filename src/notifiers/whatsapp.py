@@ -1,9 +1,23 @@
+import asyncio
+import json
 import requests
 import logging
 from datetime import datetime
-from .base import BaseNotifier
+from .base import BaseNotifier, aiohttp
+from .directory import normalize_phone_number
+from utils.tracing import get_tracer
 
 class WhatsAppNotifier(BaseNotifier):
+    channel = "whatsapp"
+    contact_field = "whatsapp_number"
+    contact_label = "WhatsApp number"
+
+    # Potongan pesan kirimi.id untuk nomor yang memang tidak bisa menerima WA
+    PERMANENT_ERRORS = (
+        "not registered", "tidak terdaftar", "not on whatsapp",
+        "invalid number", "nomor tidak valid", "not exist",
+    )
+
     def __init__(self, config):
         super().__init__()
         # URL YANG BENAR sesuai Postman
@@ -13,88 +27,138 @@ class WhatsAppNotifier(BaseNotifier):
         self.device_id = config.get("device_id")
         self.enabled = config.get("enabled", True)
         self.timeout = config.get("timeout", 15)
+        self.max_concurrency = config.get("max_concurrency", 20)
+        self.connection_limit = config.get("connection_limit", 4)
         self.logger = logging.getLogger(__name__)
         
         if not (self.user_code and self.secret and self.device_id):
             self.logger.warning("⚠️ WhatsApp credentials not configured")
             self.enabled = False
 
-    def send_patient_notification(self, patient: dict) -> bool:
-        """Kirim notifikasi dengan format yang PERSIS SAMA dengan Postman"""
+    def _build_payload(self, patient: dict) -> dict | None:
+        """Bangun payload kirimi.id; None jika tidak bisa dikirim"""
         if not self.enabled:
-            return False
+            return None
             
         whatsapp_number = patient.get("whatsapp_number")
         if not whatsapp_number:
-            self.logger.warning("⚠️ Doctor %s has no WhatsApp number", patient["nm_dokter"])
-            return False
+            self.logger.warning("⚠️ %s has no WhatsApp number", self._recipient_label(patient))
+            return None
+
+        with get_tracer().span(
+            "render", channel="whatsapp", notification_id=patient.get("notification_id")
+        ):
+            message = self._format_message(patient)
 
-        formatted_number = self._format_phone_number(whatsapp_number)
-        
         # PAYLOAD FORMAT SAMA DENGAN POSTMAN
-        payload = {
+        return {
             "user_code": self.user_code,
             "secret": self.secret,
             "device_id": self.device_id,
-            "receiver": formatted_number,
-            "message": self._format_message(patient)
+            "receiver": self._format_phone_number(whatsapp_number),
+            "message": message
         }
+
+    def _check_response(self, patient: dict, status_code: int, body: str) -> bool:
+        """Evaluasi response API (dipakai jalur sync dan async)"""
+        self.logger.info(f"WhatsApp API Response: Status {status_code}, Body: {body}")
+
+        if status_code == 200:
+            try:
+                result = json.loads(body)
+            except ValueError:
+                result = {}
+            if result.get("success") == True:
+                self.logger.info(
+                    "✅ WhatsApp sent to %s — Patient: %s",
+                    self._recipient_label(patient),
+                    patient["nm_pasien"]
+                )
+                return True
+
+        self._check_bad_recipient(patient, status_code, body)
+        self.logger.error(
+            "❌ WhatsApp failed for %s: HTTP %s - %s",
+            self._recipient_label(patient),
+            status_code,
+            body
+        )
+        return False
+
+    def _check_bad_recipient(self, patient: dict, status_code: int, body: str):
+        """Nomor tidak terdaftar / invalid di provider = penerima buruk permanen"""
+        if status_code in (401, 403) or status_code >= 500:
+            # Kredensial / gangguan provider, bukan kesalahan nomor
+            return
+        if any(marker in body.lower() for marker in self.PERMANENT_ERRORS):
+            self._report_bad_recipient(
+                "whatsapp",
+                self._format_phone_number(patient["whatsapp_number"]),
+                f"HTTP {status_code}: {body[:200]}",
+            )
+
+    def send_patient_notification(self, patient: dict) -> bool:
+        """Kirim notifikasi dengan format yang PERSIS SAMA dengan Postman"""
+        payload = self._build_payload(patient)
+        if payload is None:
+            return False
         
         headers = {"Content-Type": "application/json"}
 
         try:
-            self.logger.info("📤 Sending WhatsApp to %s", formatted_number)
+            self.logger.info("📤 Sending WhatsApp to %s", payload["receiver"])
             response = requests.post(
                 self.api_url,
                 json=payload,
                 headers=headers,
                 timeout=self.timeout
             )
+            return self._check_response(patient, response.status_code, response.text)
             
-            self.logger.info(f"WhatsApp API Response: Status {response.status_code}, Body: {response.text}")
-            
-            if response.status_code == 200:
-                result = response.json()
-                if result.get("success") == True:
-                    self.logger.info(
-                        "✅ WhatsApp sent to Dr. %s — Patient: %s",
-                        patient["nm_dokter"],
-                        patient["nm_pasien"]
-                    )
-                    return True
-            
+        except requests.exceptions.RequestException as err:
             self.logger.error(
-                "❌ WhatsApp failed for Dr. %s: HTTP %s - %s",
-                patient["nm_dokter"],
-                response.status_code,
-                response.text
+                "❌ WhatsApp request failed for %s: %s",
+                self._recipient_label(patient),
+                err
             )
             return False
-            
-        except requests.exceptions.RequestException as err:
+
+    async def send_patient_notification_async(self, patient: dict) -> bool:
+        """Versi async (aiohttp) dari send_patient_notification"""
+        if aiohttp is None:
+            return await super().send_patient_notification_async(patient)
+
+        payload = self._build_payload(patient)
+        if payload is None:
+            return False
+
+        try:
+            self.logger.info("📤 Sending WhatsApp to %s", payload["receiver"])
+            session = await self._get_session()
+            async with session.post(
+                self.api_url,
+                json=payload,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            ) as response:
+                body = await response.text()
+                return self._check_response(patient, response.status, body)
+
+        except (aiohttp.ClientError, asyncio.TimeoutError) as err:
             self.logger.error(
-                "❌ WhatsApp request failed for Dr. %s: %s",
-                patient["nm_dokter"],
+                "❌ WhatsApp request failed for %s: %s",
+                self._recipient_label(patient),
                 err
             )
             return False
 
     def _format_phone_number(self, phone: str) -> str:
-        """Format nomor telepon"""
-        if not phone:
-            return ""
-        
-        clean_phone = ''.join(filter(str.isdigit, str(phone)))
-        
-        if clean_phone.startswith('0'):
-            return clean_phone  # Format: 085758779026
-        elif clean_phone.startswith('62'):
-            return clean_phone[2:]  # Convert 6285758779026 -> 085758779026
-        else:
-            return clean_phone
+        """Format nomor telepon (lihat directory.normalize_phone_number)"""
+        return normalize_phone_number(phone)
 
     def _format_message(self, patient: dict) -> str:
         """Format pesan untuk notifikasi rawat inap"""
+        if patient.get("digest"):
+            return self._format_digest(patient)
         notif_type = patient.get("notification_type", "new_patient_dpjp")
         
         if notif_type == "new_patient_dpjp":
@@ -103,6 +167,8 @@ class WhatsAppNotifier(BaseNotifier):
             header = "🔄 *PERUBAHAN DPJP PASIEN RAWAT INAP*"
         else:
             header = "🏥 *NOTIFIKASI PASIEN RAWAT INAP*"
+        if patient.get("reminder"):
+            header = f"⏰ *PENGINGAT #{patient['reminder']} - BELUM DIKONFIRMASI*\n{header}"
 
         # Format tanggal
         tgl_masuk = patient.get('tgl_masuk', datetime.now())
@@ -129,3 +195,23 @@ class WhatsAppNotifier(BaseNotifier):
 ⏰ Notifikasi: {datetime.now().strftime('%d/%m/%Y %H:%M WIB')}
 
 _Notifikasi otomatis SIAK-RSBW_"""
+
+    def _format_digest(self, patient: dict) -> str:
+        """Satu pesan ringkasan untuk semua notifikasi digest penerima ini"""
+        items = patient["digest"]
+        lines = [f"🗂️ *RINGKASAN PASIEN RAWAT INAP ({len(items)})*"]
+        for number, item in enumerate(items, 1):
+            tgl_masuk = item.get('tgl_masuk')
+            if isinstance(tgl_masuk, datetime):
+                tgl_masuk = tgl_masuk.strftime('%d/%m/%Y %H:%M WIB')
+            lines.append(
+                f"\n{number}. 👤 *{item.get('nm_pasien', 'N/A')}* ({item.get('jenis_kelamin', 'N/A')})\n"
+                f"📋 {item.get('no_rawat', 'N/A')} / RM {item.get('no_rkm_medis', 'N/A')}\n"
+                f"🏠 {item.get('kd_kamar', 'N/A')} - {item.get('nm_bangsal', 'N/A')}\n"
+                f"👨‍⚕️ DPJP: {item.get('nm_dokter', 'N/A')}\n"
+                f"📅 {tgl_masuk or 'N/A'}\n"
+                f"🩺 {item.get('diagnosa_awal', 'N/A')}"
+            )
+        lines.append(f"\n⏰ Notifikasi: {datetime.now().strftime('%d/%m/%Y %H:%M WIB')}")
+        lines.append("\n_Notifikasi otomatis SIAK-RSBW_")
+        return "\n".join(lines)
@@ -0,0 +1,139 @@
+import multiprocessing
+import os
+import signal
+import sys
+import time
+from pathlib import Path
+
+from utils.logger import get_logger
+
+
+def shard_file(path, shard: tuple | None) -> str | None:
+    """File lokal per shard (journal, trace, lock) supaya worker tidak berbagi file"""
+    if shard is None or path is None:
+        return path
+    path = Path(path)
+    return str(path.with_name(f"{path.stem}.shard{shard[1]}{path.suffix}"))
+
+
+def _raise_keyboard_interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
+def run_worker(shard: tuple):
+    """Entry point proses worker: satu monitor yang memegang satu shard"""
+    # SIGTERM dari supervisor -> shutdown normal (lock, journal, health server)
+    signal.signal(signal.SIGTERM, _raise_keyboard_interrupt)
+    from main import HospitalNotificationQueueMonitor
+
+    try:
+        HospitalNotificationQueueMonitor(shard=shard).start_monitoring()
+    except KeyboardInterrupt:
+        pass
+
+
+class ShardSupervisor:
+    """Jalankan N worker, masing-masing memegang shard deterministik.
+
+    Row ``notification_queue`` dibagi dengan ``CRC32(key) % N`` (key:
+    ``no_rawat``, ``kd_dokter`` atau ``kd_bangsal``), sehingga satu dokter /
+    bangsal selalu diproses satu worker secara berurutan. Worker yang mati
+    di-restart di shard yang sama; bila terus crash (lebih dari
+    ``max_restarts`` dalam ``restart_window_seconds``), jumlah shard dikurangi
+    dan semua worker di-restart agar shard-nya dibagi ulang ke worker yang
+    tersisa.
+    """
+
+    def __init__(self, config: dict, lock_file: str):
+        self.logger = get_logger(__name__)
+        self.lock_file = lock_file
+        self.key = config.get("key", "no_rawat")
+        self.worker_count = max(1, config.get("workers", os.cpu_count() or 1))
+        self.max_restarts = config.get("max_restarts", 5)
+        self.restart_window = config.get("restart_window_seconds", 300)
+        self.poll_interval = config.get("poll_interval_seconds", 2)
+        self._workers = {}
+        self._deaths = []
+
+    # ---------------------------------------------------------- #
+    def _spawn(self, index: int):
+        shard = (self.key, index, self.worker_count)
+        # Lock file worker yang mati paksa tidak sempat dihapus
+        worker_lock = shard_file(self.lock_file, shard)
+        if os.path.exists(worker_lock):
+            os.remove(worker_lock)
+        process = multiprocessing.Process(
+            target=run_worker, args=(shard,), name=f"notif-worker-{index}", daemon=False
+        )
+        process.start()
+        self._workers[index] = process
+        self.logger.info(
+            "🚀 Worker %s/%s started (pid %s, key %s)",
+            index, self.worker_count, process.pid, self.key
+        )
+
+    def _stop_all(self):
+        for process in self._workers.values():
+            if process.is_alive():
+                process.terminate()
+        for process in self._workers.values():
+            process.join(timeout=30)
+            if process.is_alive():
+                process.kill()
+        self._workers.clear()
+
+    def _rebalance(self):
+        """Kurangi jumlah shard dan bagi ulang ke worker yang tersisa"""
+        new_count = max(1, self.worker_count - 1)
+        self.logger.warning(
+            "⚠️ Worker crash loop detected, rebalancing %s -> %s shards",
+            self.worker_count, new_count
+        )
+        self._stop_all()
+        self.worker_count = new_count
+        self._deaths.clear()
+        for index in range(self.worker_count):
+            self._spawn(index)
+
+    def _check_workers(self):
+        for index, process in list(self._workers.items()):
+            if process.is_alive():
+                continue
+            self.logger.error(
+                "💥 Worker %s (pid %s) exited with code %s",
+                index, process.pid, process.exitcode
+            )
+            now = time.monotonic()
+            self._deaths = [t for t in self._deaths if now - t < self.restart_window]
+            self._deaths.append(now)
+            if len(self._deaths) > self.max_restarts and self.worker_count > 1:
+                self._rebalance()
+                return
+            self._spawn(index)
+
+    # ---------------------------------------------------------- #
+    def start(self):
+        # Prevent double instance!
+        if os.path.exists(self.lock_file):
+            print("⚠️ Sudah ada proses notifikasi berjalan. Hanya boleh satu instance!")
+            sys.exit(1)
+        with open(self.lock_file, "w") as f:
+            f.write(str(os.getpid()))
+
+        signal.signal(signal.SIGTERM, _raise_keyboard_interrupt)
+        self.logger.info(
+            "🚀 Shard supervisor started — %s workers by %s", self.worker_count, self.key
+        )
+        try:
+            for index in range(self.worker_count):
+                self._spawn(index)
+            while True:
+                time.sleep(self.poll_interval)
+                self._check_workers()
+        except KeyboardInterrupt:
+            self.logger.info("🛑 Stopping all workers...")
+        finally:
+            self._stop_all()
+            if os.path.exists(self.lock_file):
+                os.remove(self.lock_file)
+
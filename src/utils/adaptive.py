@@ -0,0 +1,75 @@
+import logging
+import math
+
+
+class AdaptiveBatchController:
+    """Atur batch size & interval tick berdasarkan kedalaman queue dan latency kirim.
+
+    - Backlog (depth > batch): batch dikali dua dan interval turun ke minimum,
+      supaya antrian setelah outage cepat habis.
+    - Idle (depth == 0): batch dibagi dua dan interval naik bertahap ke
+      maksimum untuk mengurangi beban DB. Batch tidak turun di bawah
+      ``min_batch`` (default 1).
+    - Batch dibatasi supaya estimasi durasi tick (batch x latency per pesan,
+      EWMA per channel) tidak melebihi ``target_tick_seconds``.
+    """
+
+    def __init__(self, config: dict, base_interval: int, base_batch: int = 10):
+        self.logger = logging.getLogger(__name__)
+        self.min_batch = max(1, config.get("min_batch", 1))
+        self.max_batch = config.get("max_batch", 500)
+        self.min_interval = config.get("min_interval", 1)
+        self.max_interval = config.get("max_interval", max(base_interval, 60))
+        self.target_tick_seconds = config.get("target_tick_seconds", 30)
+        self.alpha = config.get("latency_alpha", 0.2)
+        self.base_interval = base_interval
+
+        self.batch_size = max(self.min_batch, min(base_batch, self.max_batch))
+        self.interval = base_interval
+        self.queue_depth = 0
+        self._latency = {}
+
+    # ---------------------------------------------------------- #
+    def record_latency(self, channel: str, seconds: float):
+        """Catat latency efektif per pesan (EWMA) untuk satu channel"""
+        previous = self._latency.get(channel)
+        if previous is None:
+            self._latency[channel] = seconds
+        else:
+            self._latency[channel] = self.alpha * seconds + (1 - self.alpha) * previous
+
+    def latency(self, channel: str) -> float | None:
+        return self._latency.get(channel)
+
+    # ---------------------------------------------------------- #
+    def update(self, queue_depth: int | None):
+        """Hitung ulang batch_size dan interval; depth None = count gagal"""
+        if queue_depth is None:
+            return
+        self.queue_depth = queue_depth
+
+        if queue_depth > self.batch_size:
+            batch = self.batch_size * 2
+            interval = self.min_interval
+        elif queue_depth == 0:
+            batch = self.batch_size // 2
+            interval = min(self.max_interval, max(self.interval, self.min_interval) * 1.5)
+        else:
+            batch = self.batch_size
+            interval = self.base_interval
+
+        # Row baru selesai setelah channel paling lambat, jadi laju batch mengikutinya
+        per_message = max(self._latency.values(), default=0)
+        if per_message > 0:
+            batch = min(batch, math.floor(self.target_tick_seconds / per_message))
+
+        batch = max(self.min_batch, min(self.max_batch, batch))
+        interval = max(self.min_interval, min(self.max_interval, math.ceil(interval)))
+
+        if batch != self.batch_size or interval != self.interval:
+            self.logger.info(
+                "📊 Adaptive batch: depth=%s batch %s→%s interval %ss→%ss",
+                queue_depth, self.batch_size, batch, self.interval, interval
+            )
+        self.batch_size = batch
+        self.interval = interval
@@ -0,0 +1,127 @@
+import logging
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Callable, List
+
+
+class ChannelQueue:
+    """Antrian pesan + worker thread milik satu channel.
+
+    Setiap channel dikonsumsi worker-nya sendiri secara independen: channel
+    yang lambat hanya menumpuk backlog di antriannya sendiri, channel lain
+    tetap jalan. ``max_backlog`` adalah batas backlog untuk admission control
+    (dicek monitor sebelum dequeue row baru), bukan batas ``put`` yang memblok.
+    """
+
+    def __init__(self, name: str, workers: int = 1, max_backlog: int = 1000):
+        self.logger = logging.getLogger(__name__)
+        self.name = name
+        self.max_backlog = max(1, max_backlog)
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._threads = [
+            threading.Thread(target=self._work, name=f"{name}-worker-{i}", daemon=True)
+            for i in range(max(1, workers))
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    # ---------------------------------------------------------- #
+    def submit(self, send: Callable[[], bool], callback: Callable[[bool], None]):
+        """Antrikan satu pengiriman; ``callback(sent)`` dipanggil dari worker thread"""
+        with self._lock:
+            self._in_flight += 1
+        self._queue.put((send, callback))
+
+    def backlog(self) -> int:
+        """Pesan yang belum selesai (antri + sedang dikirim)"""
+        with self._lock:
+            return self._in_flight
+
+    def is_full(self) -> bool:
+        return self.backlog() >= self.max_backlog
+
+    def to_dict(self) -> dict:
+        backlog = self.backlog()
+        return {
+            "backlog": backlog,
+            "max_backlog": self.max_backlog,
+            "status": "full" if backlog >= self.max_backlog else "ok",
+        }
+
+    def _work(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            send, callback = item
+            try:
+                sent = send()
+            except Exception as err:
+                self.logger.error("❌ %s send error: %s", self.name, err)
+                sent = False
+            with self._lock:
+                self._in_flight -= 1
+            try:
+                callback(sent)
+            except Exception as err:
+                self.logger.error("💥 %s result callback failed: %s", self.name, err)
+
+    def stop(self):
+        """Selesaikan antrian yang tersisa lalu hentikan worker"""
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+
+
+class PendingRow:
+    """Kumpulkan hasil semua channel satu queue row.
+
+    ``on_done(pending)`` dipanggil sekali, dari worker yang menyerahkan hasil
+    terakhir (atau langsung bila row tidak punya pesan untuk dikirim).
+    ``sent`` berisi pasangan ``(id(kunci), channel)`` yang berhasil;
+    ``future`` di-resolve pemilik row setelah row difinalisasi.
+    """
+
+    def __init__(self, row, expected: int, finalize: bool, on_done: Callable):
+        self.row = row
+        self.finalize = finalize
+        self.sent = set()
+        self.future = Future()
+        self._remaining = expected
+        self._lock = threading.Lock()
+        self._on_done = on_done
+        if expected == 0:
+            on_done(self)
+
+    def record(self, key, channel: str, sent: bool):
+        with self._lock:
+            if sent:
+                self.sent.add((id(key), channel))
+            self._remaining -= 1
+            done = self._remaining == 0
+        if done:
+            self._on_done(self)
+
+
+def all_done(futures: List[Future]) -> Future:
+    """Future yang selesai setelah semua ``futures`` selesai"""
+    combined = Future()
+    remaining = [len(futures)]
+    lock = threading.Lock()
+
+    def _one_done(_):
+        with lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if last:
+            combined.set_result(None)
+
+    if not futures:
+        combined.set_result(None)
+    for future in futures:
+        future.add_done_callback(_one_done)
+    return combined
@@ -0,0 +1,59 @@
+import threading
+import time
+
+
+class ProviderCircuit:
+    """Status circuit per provider berdasarkan kegagalan kirim berturut-turut.
+
+    ``closed``  : normal
+    ``open``    : >= failure_threshold kegagalan berturut-turut
+    ``half_open``: sudah lewat reset_timeout sejak open, menunggu hasil berikutnya
+
+    Saat ini dipakai untuk pelaporan health; pengiriman tidak diblokir.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: int = 60):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.last_success_at = None
+        self.last_failure_at = None
+
+    def record_success(self):
+        with self._lock:
+            self.consecutive_failures = 0
+            self.opened_at = None
+            self.last_success_at = time.time()
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            self.last_failure_at = time.time()
+            if self.consecutive_failures >= self.failure_threshold and self.opened_at is None:
+                self.opened_at = time.monotonic()
+
+    def record(self, success: bool):
+        if success:
+            self.record_success()
+        else:
+            self.record_failure()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self.opened_at is None:
+                return "closed"
+            if time.monotonic() - self.opened_at >= self.reset_timeout:
+                return "half_open"
+            return "open"
+
+    def to_dict(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "last_success_at": self.last_success_at,
+            "last_failure_at": self.last_failure_at,
+        }
@@ -68,3 +68,47 @@ class Config:
     @property
     def app(self):
         return self._config['app']
+
+    @property
+    def adaptive_batch(self):
+        return self._config.get('adaptive_batch', {})
+
+    @property
+    def analytics(self):
+        return self._config.get('analytics', {})
+
+    @property
+    def send_policies(self):
+        return self._config.get('send_policies', {})
+
+    @property
+    def tracing(self):
+        return self._config.get('tracing', {})
+
+    @property
+    def outbox(self):
+        return self._config.get('outbox', {})
+
+    @property
+    def sharding(self):
+        return self._config.get('sharding', {})
+
+    @property
+    def health(self):
+        return self._config.get('health', {})
+
+    @property
+    def directory(self):
+        return self._config.get('directory', {})
+
+    @property
+    def ward_subscriptions(self):
+        return self._config.get('ward_subscriptions') or {}
+
+    @property
+    def change_capture(self):
+        return self._config.get('change_capture', {})
+
+    def channel(self, name):
+        """Section config untuk satu channel notifikasi (registry)"""
+        return self._config.get(name) or {}
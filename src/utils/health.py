@@ -0,0 +1,135 @@
+import json
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class HealthMonitor:
+    """Kumpulkan status health monitor dengan probe yang di-cache.
+
+    Probe DB dan queue lag hanya dijalankan paling sering sekali per
+    ``probe_ttl_seconds``, sehingga cek supervisor yang sering tidak
+    menambah beban DB maupun provider (provider tidak pernah di-probe;
+    statusnya diambil dari circuit hasil pengiriman nyata).
+    """
+
+    def __init__(self, config: dict, db_probe, lag_probe, circuits: dict, tick_interval,
+                 channel_queues: dict | None = None):
+        self.logger = logging.getLogger(__name__)
+        self.probe_ttl = config.get("probe_ttl_seconds", 15)
+        self.stale_after = config.get("stale_after_seconds")
+        self.db_probe = db_probe
+        self.lag_probe = lag_probe
+        self.circuits = circuits
+        self.tick_interval = tick_interval
+        self.channel_queues = channel_queues or {}
+        self.started_at = time.time()
+        self.last_tick_at = None
+        self.last_successful_tick_at = None
+        self._lock = threading.Lock()
+        self._probe_cache = {}
+
+    # ---------------------------------------------------------- #
+    def record_tick(self, success: bool):
+        now = time.time()
+        with self._lock:
+            self.last_tick_at = now
+            if success:
+                self.last_successful_tick_at = now
+
+    def _cached_probe(self, name: str, probe):
+        with self._lock:
+            cached = self._probe_cache.get(name)
+            if cached and time.monotonic() - cached[0] < self.probe_ttl:
+                return cached[1]
+        try:
+            value = probe()
+        except Exception as err:
+            self.logger.error("❌ Health probe %s failed: %s", name, err)
+            value = None
+        with self._lock:
+            self._probe_cache[name] = (time.monotonic(), value)
+        return value
+
+    def _stale_threshold(self) -> float:
+        if self.stale_after:
+            return self.stale_after
+        return max(3 * self.tick_interval(), 60)
+
+    # ---------------------------------------------------------- #
+    def liveness(self) -> dict:
+        """Proses hidup dan loop tick masih berjalan"""
+        last = self.last_successful_tick_at or self.started_at
+        age = time.time() - last
+        return {
+            "status": "ok" if age <= self._stale_threshold() else "stale",
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "last_tick_at": self.last_tick_at,
+            "last_successful_tick_at": self.last_successful_tick_at,
+            "seconds_since_successful_tick": round(age, 1),
+        }
+
+    def readiness(self) -> dict:
+        """Liveness + DB pool + queue lag + circuit dan backlog per provider"""
+        report = self.liveness()
+        db_ok = bool(self._cached_probe("database", self.db_probe))
+        report["database"] = {"status": "ok" if db_ok else "down"}
+        report["queue_lag_seconds"] = self._cached_probe("queue_lag", self.lag_probe)
+        report["providers"] = {name: c.to_dict() for name, c in self.circuits.items()}
+        report["channel_backlog"] = {
+            name: q.to_dict() for name, q in self.channel_queues.items()
+        }
+        ready = db_ok and report["status"] == "ok"
+        report["status"] = "ready" if ready else "not_ready"
+        return report
+
+
+class HealthServer:
+    """HTTP endpoint ringan: GET /health (liveness) dan /ready (readiness)"""
+
+    def __init__(self, health: HealthMonitor, host: str = "127.0.0.1", port: int = 8085):
+        self.health = health
+        self.host = host
+        self.port = port
+        self.logger = logging.getLogger(__name__)
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        health = self.health
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip("/") in ("", "/health"):
+                    body = health.liveness()
+                    code = 200 if body["status"] == "ok" else 503
+                elif self.path.rstrip("/") == "/ready":
+                    body = health.readiness()
+                    code = 200 if body["status"] == "ready" else 503
+                else:
+                    body, code = {"error": "not found"}, 404
+                payload = json.dumps(body).encode("utf-8")
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                # Jangan penuhi log dengan request probe supervisor
+                pass
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="health-server", daemon=True
+        )
+        self._thread.start()
+        self.logger.info("✅ Health endpoint listening on http://%s:%s", self.host, self.port)
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
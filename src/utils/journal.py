@@ -0,0 +1,149 @@
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+DEFAULT_JOURNAL_PATH = Path(__file__).parent.parent.parent / 'logs' / 'send_journal.jsonl'
+
+
+class SendJournal:
+    """Write-ahead log (append-only) untuk attempt & outcome pengiriman.
+
+    Setiap baris adalah JSON: ``{"ts", "id", "event", "status", "error"}``
+    dengan event ``attempt`` / ``outcome`` / ``committed``. Outcome yang belum
+    ``committed`` di-replay ke database saat startup atau reconnect.
+    """
+
+    def __init__(self, path=None, fsync_every: int = 50):
+        self.logger = logging.getLogger(__name__)
+        self.path = Path(path) if path else DEFAULT_JOURNAL_PATH
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.fsync_every = max(1, fsync_every)
+        self._unsynced = 0
+        self._attempts = set()
+        self._outcomes: Dict[int, Tuple[str, str | None]] = {}
+        self._load()
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+    # ---------------------------------------------------------- #
+    def _load(self):
+        """Baca ulang journal untuk membangun state yang belum committed"""
+        if not self.path.exists():
+            return
+        self._repair_tail()
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Baris terakhir bisa terpotong saat crash
+                    self.logger.warning("⚠️ Skipping corrupt journal line")
+                    continue
+                self._apply(entry)
+        if self._outcomes:
+            self.logger.info("📊 Journal loaded: %s uncommitted outcomes", len(self._outcomes))
+        if self._attempts:
+            # Crash di tengah kirim: hasil tidak diketahui, row tetap pending (at-least-once)
+            self.logger.warning(
+                "⚠️ %s send attempts without outcome, will be retried: %s",
+                len(self._attempts),
+                sorted(self._attempts),
+            )
+
+    def _repair_tail(self):
+        """Potong baris terakhir yang terpotong crash (tanpa newline).
+
+        Tanpa ini record berikutnya di-append ke baris rusak itu dan ikut
+        hilang saat replay.
+        """
+        with open(self.path, 'rb+') as f:
+            data = f.read()
+            if not data or data.endswith(b'\n'):
+                return
+            f.truncate(data.rfind(b'\n') + 1)
+            f.flush()
+            os.fsync(f.fileno())
+        self.logger.warning("⚠️ Truncated incomplete last journal line")
+
+    def _apply(self, entry: dict):
+        notif_id = entry.get('id')
+        event = entry.get('event')
+        if event == 'attempt':
+            self._attempts.add(notif_id)
+        elif event == 'outcome':
+            self._attempts.discard(notif_id)
+            self._outcomes[notif_id] = (entry.get('status'), entry.get('error'))
+        elif event == 'committed':
+            self._attempts.discard(notif_id)
+            self._outcomes.pop(notif_id, None)
+
+    def _write(self, entry: dict):
+        entry['ts'] = time.time()
+        self._apply(entry)
+        self._file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        # Selalu serahkan ke OS: proses yang di-kill tidak kehilangan outcome.
+        # Hanya fsync (tahan mati listrik) yang di-batch.
+        self._file.flush()
+        self._unsynced += 1
+        if self._unsynced >= self.fsync_every:
+            self.flush()
+
+    # ---------------------------------------------------------- #
+    def record_attempt(self, notification_id: int):
+        self._write({'id': notification_id, 'event': 'attempt'})
+
+    def record_outcome(self, notification_id: int, status: str, error_message: str | None = None):
+        self._write({
+            'id': notification_id,
+            'event': 'outcome',
+            'status': status,
+            'error': error_message,
+        })
+
+    def record_committed(self, notification_ids: List[int]):
+        for notif_id in notification_ids:
+            self._write({'id': notif_id, 'event': 'committed'})
+        self.flush()
+
+    def flush(self):
+        """Flush + fsync batch yang tertunda ke disk"""
+        if self._file.closed:
+            return
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+
+    # ---------------------------------------------------------- #
+    def pending_outcomes(self) -> List[Tuple[int, str, str | None]]:
+        """Outcome yang sudah tercatat tapi belum ter-commit ke database"""
+        return [(nid, status, err) for nid, (status, err) in self._outcomes.items()]
+
+    def has_outcome(self, notification_id: int) -> bool:
+        return notification_id in self._outcomes
+
+    def compact(self):
+        """Tulis ulang journal hanya dengan outcome yang belum committed"""
+        self.flush()
+        self._file.close()
+        tmp_path = self.path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for notif_id, (status, err) in self._outcomes.items():
+                f.write(json.dumps({
+                    'id': notif_id,
+                    'event': 'outcome',
+                    'status': status,
+                    'error': err,
+                    'ts': time.time(),
+                }, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self._attempts.clear()
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+    def close(self):
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
@@ -0,0 +1,94 @@
+import zlib
+from datetime import datetime, time as dtime, timedelta
+
+
+def _parse_time(value: str) -> dtime:
+    hour, minute = str(value).split(":")
+    return dtime(int(hour), int(minute))
+
+
+def recipient_key(message: dict) -> str:
+    """Identitas stabil penerima (dokter atau kombinasi kontak staf bangsal)"""
+    if message.get("kd_dokter"):
+        return f"dokter:{message['kd_dokter']}"
+    return "kontak:" + "|".join(
+        str(message.get(field) or "") for field in ("telegram_id", "whatsapp_number", "email")
+    )
+
+
+class SendPolicy:
+    """Aturan waktu kirim: quiet hours, digest bertahap, dan reminder.
+
+    - ``quiet_hours``: pesan non-urgent untuk dokter yang sedang quiet hours
+      (default global, bisa di-override per ``kd_dokter``) ditunda sampai
+      jam selesai.
+    - ``digest``: tipe notifikasi tertentu dikumpulkan per penerima dan
+      dikirim bersama di slot ``interval_minutes`` berikutnya, digeser
+      deterministik per penerima (``stagger_seconds``) supaya tidak serentak.
+    - ``reminder``: notifikasi terkirim yang belum di-acknowledge dikirim
+      ulang setiap ``after_minutes``, maksimal ``max_reminders`` kali.
+    """
+
+    def __init__(self, config: dict | None = None):
+        config = config or {}
+        quiet = config.get("quiet_hours", {})
+        self.quiet_enabled = quiet.get("enabled", False)
+        self.quiet_window = (
+            _parse_time(quiet.get("start", "22:00")),
+            _parse_time(quiet.get("end", "06:00")),
+        )
+        self.quiet_doctors = {
+            kd_dokter: (_parse_time(window["start"]), _parse_time(window["end"]))
+            for kd_dokter, window in (quiet.get("doctors") or {}).items()
+        }
+        self.urgent_types = set(quiet.get("urgent_types", []))
+
+        digest = config.get("digest", {})
+        self.digest_enabled = digest.get("enabled", False)
+        self.digest_types = set(digest.get("types", []))
+        self.digest_interval = max(1, digest.get("interval_minutes", 60)) * 60
+        self.digest_stagger = max(1, digest.get("stagger_seconds", 300))
+
+        reminder = config.get("reminder", {})
+        self.reminder_enabled = reminder.get("enabled", False)
+        self.reminder_after = timedelta(minutes=reminder.get("after_minutes", 30))
+        self.max_reminders = reminder.get("max_reminders", 2)
+        self.reminder_types = set(reminder.get("types", []))
+
+    @property
+    def enabled(self) -> bool:
+        return self.quiet_enabled or self.digest_enabled or self.reminder_enabled
+
+    # ---------------------------------------------------------- #
+    def quiet_until(self, message: dict, when: datetime) -> datetime | None:
+        """Akhir quiet hours bila ``when`` jatuh di dalamnya, selain itu None"""
+        if not self.quiet_enabled or message.get("notification_type") in self.urgent_types:
+            return None
+        start, end = self.quiet_doctors.get(message.get("kd_dokter"), self.quiet_window)
+        now = when.time()
+        inside = start <= now < end if start <= end else (now >= start or now < end)
+        if not inside:
+            return None
+        until = datetime.combine(when.date(), end)
+        if until <= when:
+            until += timedelta(days=1)
+        return until
+
+    def digest_due(self, message: dict, when: datetime) -> datetime | None:
+        """Slot digest penerima ini, atau None bila tipe tidak di-digest"""
+        if not self.digest_enabled or message.get("notification_type") not in self.digest_types:
+            return None
+        epoch = when.timestamp()
+        slot = epoch - epoch % self.digest_interval + self.digest_interval
+        offset = zlib.crc32(recipient_key(message).encode("utf-8")) % self.digest_stagger
+        due = datetime.fromtimestamp(slot + offset)
+        return self.quiet_until(message, due) or due
+
+    def reminder_due(self, message: dict, when: datetime, attempt: int) -> datetime | None:
+        """Jadwal reminder ke-``attempt`` atau None bila tidak perlu"""
+        if not self.reminder_enabled or attempt > self.max_reminders:
+            return None
+        if self.reminder_types and message.get("notification_type") not in self.reminder_types:
+            return None
+        due = when + self.reminder_after
+        return self.quiet_until(message, due) or due
@@ -0,0 +1,212 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime
+from typing import Callable, Dict
+
+
+class TimerJob:
+    __slots__ = ("due", "kind", "payload", "job_id", "dedupe_key", "callback", "interval", "cancelled")
+
+    def __init__(self, due: float, kind: str, payload=None, job_id=None, dedupe_key=None,
+                 callback=None, interval=None):
+        self.due = due
+        self.kind = kind
+        self.payload = payload
+        self.job_id = job_id
+        self.dedupe_key = dedupe_key
+        self.callback = callback
+        self.interval = interval
+        self.cancelled = False
+
+
+class TimerScheduler:
+    """Scheduler berbasis heap (O(log n) per job) pengganti busy loop ``schedule``.
+
+    Dua jenis job:
+
+    - recurring (``every``): callback in-process, mis. tick queue; interval
+      dibaca ulang setiap kali job selesai, sehingga interval adaptif langsung
+      berlaku.
+    - timed (``schedule_at``): job dengan ``kind`` + payload yang ditangani
+      handler terdaftar. Bila ada ``store``, job dipersist ke DB dan dimuat
+      ulang saat startup supaya selamat dari restart.
+
+    Handler boleh mengembalikan ``Future``: job baru ditandai selesai (atau
+    dijadwalkan ulang bila gagal) setelah future itu selesai.
+
+    ``run_forever`` tidur sampai job terdekat jatuh tempo (tidak polling
+    per detik).
+    """
+
+    def __init__(self, store=None, retry_seconds: int = 60):
+        self.logger = logging.getLogger(__name__)
+        self.store = store
+        self.retry_seconds = retry_seconds
+        self._heap = []
+        self._seq = itertools.count()
+        self._lock = threading.RLock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._handlers: Dict[str, Callable] = {}
+        self._by_key: Dict[str, TimerJob] = {}
+
+    # ---------------------------------------------------------- #
+    def register(self, kind: str, handler: Callable):
+        self._handlers[kind] = handler
+
+    def _push(self, job: TimerJob):
+        with self._lock:
+            heapq.heappush(self._heap, (job.due, next(self._seq), job))
+            if job.dedupe_key:
+                self._by_key[job.dedupe_key] = job
+        self._wakeup.set()
+
+    def every(self, interval: Callable[[], float], callback: Callable, first_run: float = 0):
+        """Job berulang; ``interval`` callable dievaluasi ulang setiap run"""
+        job = TimerJob(time.time() + first_run, "recurring", callback=callback, interval=interval)
+        self._push(job)
+        return job
+
+    def call_soon(self, callback: Callable):
+        """Callback sekali jalan di thread scheduler; aman dipanggil dari thread lain"""
+        job = TimerJob(time.time(), "callback", callback=callback)
+        self._push(job)
+        return job
+
+    def schedule_at(self, due_at: datetime, kind: str, payload: dict,
+                    dedupe_key: str | None = None) -> TimerJob | None:
+        """Jadwalkan job timed; None bila gagal dipersist (caller kirim langsung)"""
+        job_id = None
+        if self.store is not None:
+            job_id = self.store.add(kind, due_at, payload, dedupe_key)
+            if job_id is None:
+                return None
+        job = TimerJob(due_at.timestamp(), kind, payload, job_id, dedupe_key)
+        self._push(job)
+        return job
+
+    def pending_job(self, dedupe_key: str) -> TimerJob | None:
+        """Job timed yang belum jalan dengan key ini (untuk digest)"""
+        with self._lock:
+            job = self._by_key.get(dedupe_key)
+            return job if job is not None and not job.cancelled else None
+
+    def update_payload(self, job: TimerJob, payload: dict) -> bool:
+        if self.store is not None and job.job_id is not None:
+            if not self.store.update_payload(job.job_id, payload):
+                return False
+        with self._lock:
+            job.payload = payload
+        return True
+
+    def cancel(self, job: TimerJob):
+        with self._lock:
+            job.cancelled = True
+            if job.dedupe_key and self._by_key.get(job.dedupe_key) is job:
+                del self._by_key[job.dedupe_key]
+
+    def load(self) -> int:
+        """Muat job persisten yang masih pending dari store"""
+        if self.store is None:
+            return 0
+        rows = self.store.load_pending()
+        for row in rows:
+            self._push(TimerJob(
+                row["due_at"].timestamp(), row["kind"], row["payload"], row["id"], row["dedupe_key"]
+            ))
+        if rows:
+            self.logger.info("📊 Loaded %s scheduled jobs", len(rows))
+        return len(rows)
+
+    def __len__(self):
+        with self._lock:
+            return sum(1 for _, _, job in self._heap if not job.cancelled)
+
+    # ---------------------------------------------------------- #
+    def next_delay(self) -> float | None:
+        """Detik sampai job terdekat; None bila heap kosong"""
+        with self._lock:
+            while self._heap and self._heap[0][2].cancelled:
+                heapq.heappop(self._heap)
+            if not self._heap:
+                return None
+            return max(0.0, self._heap[0][0] - time.time())
+
+    def _pop_due(self) -> list:
+        now = time.time()
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                _, _, job = heapq.heappop(self._heap)
+                if job.cancelled:
+                    continue
+                if job.dedupe_key and self._by_key.get(job.dedupe_key) is job:
+                    del self._by_key[job.dedupe_key]
+                due.append(job)
+        return due
+
+    def run_pending(self) -> int:
+        """Jalankan semua job yang jatuh tempo; kembalikan jumlah job"""
+        jobs = self._pop_due()
+        done_ids = []
+        for job in jobs:
+            if job.callback is not None:
+                try:
+                    job.callback()
+                except Exception as err:
+                    self.logger.error("💥 %s job error: %s", job.kind.capitalize(), err)
+                if job.interval is not None:
+                    job.due = time.time() + job.interval()
+                    self._push(job)
+                continue
+
+            handler = self._handlers.get(job.kind)
+            try:
+                if handler is None:
+                    raise RuntimeError(f"no handler for job kind {job.kind!r}")
+                result = handler(job.payload)
+                if isinstance(result, Future):
+                    result.add_done_callback(lambda future, job=job: self._job_finished(job, future))
+                elif job.job_id is not None:
+                    done_ids.append(job.job_id)
+            except Exception as err:
+                self._retry(job, err)
+
+        if done_ids and self.store is not None:
+            self.store.mark_done(done_ids)
+        return len(jobs)
+
+    def _retry(self, job: TimerJob, err):
+        self.logger.error(
+            "💥 Scheduled %s job %s failed, retry in %ss: %s",
+            job.kind, job.job_id, self.retry_seconds, err
+        )
+        job.due = time.time() + self.retry_seconds
+        self._push(job)
+
+    def _job_finished(self, job: TimerJob, future: Future):
+        """Penyelesaian job yang handler-nya mengembalikan Future"""
+        err = future.exception()
+        if err is not None:
+            self._retry(job, err)
+        elif job.job_id is not None and self.store is not None:
+            self.store.mark_done([job.job_id])
+
+    def run_forever(self):
+        """Loop utama mode sync: tidur sampai job berikutnya atau ada job baru"""
+        self._stopped.clear()
+        while not self._stopped.is_set():
+            self._wakeup.clear()
+            delay = self.next_delay()
+            if delay is None or delay > 0:
+                self._wakeup.wait(timeout=delay)
+                continue
+            self.run_pending()
+
+    def stop(self):
+        self._stopped.set()
+        self._wakeup.set()
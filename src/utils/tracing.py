@@ -0,0 +1,158 @@
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+DEFAULT_TRACE_PATH = Path(__file__).parent.parent.parent / 'logs' / 'traces.jsonl'
+
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+
+class Span:
+    """Satu span timing; field mengikuti model span OpenTelemetry"""
+
+    __slots__ = ('name', 'trace_id', 'span_id', 'parent_span_id', 'attributes',
+                 'start_ns', 'end_ns', 'status', 'error')
+
+    def __init__(self, name: str, parent=None, attributes: dict | None = None):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_span_id = parent.span_id if parent else None
+        self.attributes = dict(attributes or {})
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.status = 'OK'
+        self.error = None
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1_000_000
+
+    def to_dict(self) -> dict:
+        """JSON datar satu span; nama field mengikuti OpenTelemetry, tapi bukan OTLP/JSON"""
+        return {
+            'traceId': self.trace_id,
+            'spanId': self.span_id,
+            'parentSpanId': self.parent_span_id,
+            'name': self.name,
+            'startTimeUnixNano': self.start_ns,
+            'endTimeUnixNano': self.end_ns,
+            'durationMs': round(self.duration_ms, 3),
+            'attributes': self.attributes,
+            'status': {'code': self.status, 'message': self.error},
+        }
+
+
+class _NoopSpan:
+    def set_attribute(self, key, value):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class FileSpanExporter:
+    """Tulis span selesai ke file JSON lines (satu span per baris)"""
+
+    def __init__(self, path=None, flush_every: int = 20):
+        self.path = Path(path) if path else DEFAULT_TRACE_PATH
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.flush_every = max(1, flush_every)
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+    def export(self, span: Span):
+        line = json.dumps(span.to_dict(), ensure_ascii=False, default=str)
+        with self._lock:
+            self._file.write(line + '\n')
+            self._pending += 1
+            if self._pending >= self.flush_every or span.parent_span_id is None:
+                self._file.flush()
+                self._pending = 0
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.flush()
+                self._file.close()
+
+
+class Tracer:
+    """Tracer ringan dengan span context-managed (nested via contextvars).
+
+    Saat disabled, ``span()`` hanya mengembalikan no-op span sehingga
+    overhead di jalur produksi hampir nol.
+    """
+
+    def __init__(self, enabled: bool = False, exporter=None, slow_span_ms: float | None = None):
+        self.enabled = enabled
+        self.exporter = exporter
+        self.slow_span_ms = slow_span_ms
+        self.logger = logging.getLogger(__name__)
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        if not self.enabled:
+            yield _NOOP_SPAN
+            return
+
+        span = Span(name, _current_span.get(), attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except Exception as err:
+            span.status = 'ERROR'
+            span.error = str(err)
+            raise
+        finally:
+            span.end_ns = time.time_ns()
+            _current_span.reset(token)
+            self._finish(span)
+
+    def _finish(self, span: Span):
+        if self.slow_span_ms is not None and span.duration_ms >= self.slow_span_ms:
+            self.logger.warning(
+                "⏱️ Slow span %s: %.1f ms %s", span.name, span.duration_ms, span.attributes
+            )
+        if self.exporter is not None:
+            try:
+                self.exporter.export(span)
+            except Exception as err:
+                self.logger.error("❌ Span export failed: %s", err)
+
+    def shutdown(self):
+        if self.exporter is not None:
+            self.exporter.close()
+
+
+_tracer = Tracer()
+
+
+def configure_tracing(config: dict | None) -> Tracer:
+    """Aktifkan tracing global dari section ``tracing`` di config"""
+    global _tracer
+    config = config or {}
+    _tracer.shutdown()
+    exporter = None
+    if config.get('enabled', False) and config.get('exporter', 'file') == 'file':
+        exporter = FileSpanExporter(config.get('file'), config.get('flush_every', 20))
+    _tracer = Tracer(
+        enabled=config.get('enabled', False),
+        exporter=exporter,
+        slow_span_ms=config.get('slow_span_ms'),
+    )
+    return _tracer
+
+
+def get_tracer() -> Tracer:
+    """Get configured tracer"""
+    return _tracer
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Modul aplikasi diimpor seperti di src/main.py (database.*, utils.*, notifiers.*)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
@@ -0,0 +1,35 @@
+from utils.adaptive import AdaptiveBatchController
+
+
+def test_idle_queue_shrinks_batch_and_backs_off_interval():
+    controller = AdaptiveBatchController({}, base_interval=10, base_batch=10)
+    controller.update(0)
+    assert controller.batch_size == 5
+    assert controller.interval == 15
+    for _ in range(10):
+        controller.update(0)
+    assert controller.batch_size == 1
+    assert controller.interval == 60
+
+
+def test_backlog_doubles_batch_at_min_interval():
+    controller = AdaptiveBatchController({"max_batch": 50}, base_interval=10, base_batch=10)
+    controller.update(1000)
+    assert (controller.batch_size, controller.interval) == (20, 1)
+    controller.update(1000)
+    controller.update(1000)
+    assert controller.batch_size == 50
+
+
+def test_slowest_channel_latency_caps_batch():
+    controller = AdaptiveBatchController({"target_tick_seconds": 30}, base_interval=10, base_batch=10)
+    controller.record_latency("telegram", 0.1)
+    controller.record_latency("email", 2.0)
+    controller.update(1000)
+    assert controller.batch_size == 15
+
+
+def test_failed_count_keeps_current_settings():
+    controller = AdaptiveBatchController({}, base_interval=10, base_batch=10)
+    controller.update(None)
+    assert (controller.batch_size, controller.interval) == (10, 10)
@@ -0,0 +1,111 @@
+from datetime import datetime, timedelta
+
+from database.change_capture import InpatientChangeCapture
+
+
+class FakeQueries:
+    """kamar_inap LEFT JOIN dpjp_ranap di memori"""
+
+    def __init__(self):
+        self.kamar_inap = []
+        self.dpjp = {}
+        self.fail = False
+
+    def _rows(self, admissions):
+        return [
+            {**row, "kd_dokter": self.dpjp.get(row["no_rawat"])}
+            for row in sorted(admissions, key=lambda r: (r["tgl_masuk"], r["no_rawat"]))
+        ]
+
+    def get_inpatients_after(self, tgl_masuk, no_rawat, limit=500):
+        if self.fail:
+            return None
+        after = [
+            r for r in self.kamar_inap
+            if (r["tgl_masuk"], r["no_rawat"]) > (tgl_masuk, no_rawat)
+        ]
+        return self._rows(after)[:limit]
+
+    def get_inpatients_by_no_rawat(self, no_rawat_list):
+        if self.fail:
+            return None
+        return self._rows([r for r in self.kamar_inap if r["no_rawat"] in no_rawat_list])
+
+
+def _capture(tmp_path, queries):
+    return InpatientChangeCapture(
+        queries, {"state_file": str(tmp_path / "state.json"), "lookback_seconds": 300}
+    )
+
+
+def _admit(queries, no_rawat, kd_kamar, when):
+    queries.kamar_inap.append({"no_rawat": no_rawat, "kd_kamar": kd_kamar, "tgl_masuk": when})
+
+
+def test_uncommitted_poll_is_recaptured_after_restart(tmp_path):
+    queries = FakeQueries()
+    capture = _capture(tmp_path, queries)
+    _admit(queries, "2026/01/01/0001", "K1", datetime.now() + timedelta(seconds=1))
+    queries.dpjp["2026/01/01/0001"] = "D01"
+
+    assert [r["no_rawat"] for r in capture.poll()] == ["2026/01/01/0001"]
+    # Enqueue gagal: tidak ada commit, proses restart
+    restarted = _capture(tmp_path, queries)
+    assert [r["no_rawat"] for r in restarted.poll()] == ["2026/01/01/0001"]
+    restarted.commit()
+    assert _capture(tmp_path, queries).poll() == []
+
+
+def test_query_failure_returns_none(tmp_path):
+    queries = FakeQueries()
+    capture = _capture(tmp_path, queries)
+    queries.fail = True
+    assert capture.poll() is None
+
+
+def test_room_transfer_is_not_a_new_admission(tmp_path):
+    queries = FakeQueries()
+    capture = _capture(tmp_path, queries)
+    admitted = datetime.now() + timedelta(seconds=1)
+    _admit(queries, "2026/01/01/0002", "K1", admitted)
+    queries.dpjp["2026/01/01/0002"] = "D01"
+    assert len(capture.poll()) == 1
+    capture.commit()
+
+    _admit(queries, "2026/01/01/0002", "K2", admitted + timedelta(seconds=60))
+    assert capture.poll() == []
+
+
+def test_late_dpjp_assignment_is_captured(tmp_path):
+    queries = FakeQueries()
+    capture = _capture(tmp_path, queries)
+    # Di luar jendela lookback saat DPJP akhirnya diisi
+    _admit(queries, "2026/01/01/0003", "K1", datetime.now() + timedelta(seconds=1))
+    assert capture.poll() == []
+    capture.commit()
+    _admit(queries, "2026/01/01/0004", "K3", datetime.now() + timedelta(hours=1))
+    queries.dpjp["2026/01/01/0004"] = "D02"
+    assert [r["no_rawat"] for r in capture.poll()] == ["2026/01/01/0004"]
+    capture.commit()
+
+    queries.dpjp["2026/01/01/0003"] = "D01"
+    rows = capture.poll()
+    assert [(r["no_rawat"], r["kd_dokter"]) for r in rows] == [("2026/01/01/0003", "D01")]
+    capture.commit()
+    assert capture.poll() == []
+
+
+def test_binlog_first_run_starts_from_current_position(monkeypatch):
+    import database.change_capture as change_capture
+
+    def no_stream(**kwargs):
+        raise AssertionError("first run must not read old binlog events")
+
+    monkeypatch.setattr(change_capture, "BinLogStreamReader", no_stream)
+    reader = object.__new__(change_capture.BinlogInpatientReader)
+    reader.logger = change_capture.logging.getLogger(__name__)
+    reader._current_position = lambda: {"log_file": "binlog.000042", "log_pos": 1234}
+
+    assert reader.read_new_no_rawat({}) == ([], {"log_file": "binlog.000042", "log_pos": 1234})
+    reader._current_position = lambda: None
+    assert reader.read_new_no_rawat({}) is None
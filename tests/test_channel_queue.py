@@ -0,0 +1,73 @@
+import threading
+
+from utils.channel_queue import ChannelQueue, PendingRow, all_done
+
+
+def test_slow_channel_does_not_hold_back_other_channels():
+    release = threading.Event()
+    fast_done = threading.Event()
+    slow = ChannelQueue("slow")
+    fast = ChannelQueue("fast")
+
+    slow.submit(lambda: release.wait(5), lambda sent: None)
+    fast.submit(lambda: True, lambda sent: fast_done.set())
+
+    assert fast_done.wait(2)
+    assert slow.backlog() == 1 and fast.backlog() == 0
+    release.set()
+    slow.stop()
+    fast.stop()
+    assert slow.backlog() == 0
+
+
+def test_backlog_bound_is_reported():
+    release = threading.Event()
+    channel = ChannelQueue("telegram", max_backlog=2)
+    channel.submit(release.wait, lambda sent: None)
+    assert not channel.is_full()
+    channel.submit(release.wait, lambda sent: None)
+    assert channel.is_full()
+    assert channel.to_dict() == {"backlog": 2, "max_backlog": 2, "status": "full"}
+    release.set()
+    channel.stop()
+    assert channel.to_dict()["status"] == "ok"
+
+
+def test_send_error_counts_as_failed():
+    results = []
+
+    def broken():
+        raise RuntimeError("boom")
+
+    channel = ChannelQueue("email")
+    channel.submit(broken, results.append)
+    channel.stop()
+    assert results == [False]
+
+
+def test_row_completes_once_after_every_channel_result():
+    done = []
+    message = {"recipient_name": "dr. A"}
+    pending = PendingRow(("notif", [message]), 2, True, done.append)
+
+    pending.record(message, "telegram", True)
+    assert done == []
+    pending.record(message, "whatsapp", False)
+    assert done == [pending]
+    assert pending.sent == {(id(message), "telegram")}
+
+
+def test_row_without_targets_completes_immediately():
+    done = []
+    pending = PendingRow(("notif", []), 0, False, done.append)
+    assert done == [pending]
+
+
+def test_all_done_waits_for_every_future():
+    rows = [PendingRow(None, 1, True, lambda p: None) for _ in range(2)]
+    combined = all_done([row.future for row in rows])
+    rows[0].future.set_result(None)
+    assert not combined.done()
+    rows[1].future.set_result(None)
+    assert combined.done()
+    assert all_done([]).done()
@@ -0,0 +1,45 @@
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("requests")
+
+from notifiers.email import EmailNotifier  # noqa: E402
+from notifiers.telegram import TelegramNotifier  # noqa: E402
+from notifiers.whatsapp import WhatsAppNotifier  # noqa: E402
+
+
+def _patient(nm_pasien, no_rawat):
+    return {
+        "notification_id": int(no_rawat[-1]),
+        "nm_pasien": nm_pasien, "jenis_kelamin": "L",
+        "no_rawat": no_rawat, "no_rkm_medis": "000123",
+        "kd_kamar": "K01", "nm_bangsal": "Melati", "kd_bangsal": "MEL",
+        "nm_dokter": "dr. A", "tgl_masuk": datetime(2024, 5, 1, 8, 30),
+        "diagnosa_awal": "observasi",
+        "telegram_id": "111", "whatsapp_number": "081234567890", "email": "a@example.com",
+    }
+
+
+def _digest():
+    items = [_patient("Budi", "2024/05/01/000001"), _patient("Sari", "2024/05/01/000002")]
+    return {**items[0], "notification_id": None, "digest": items}
+
+
+def test_telegram_digest_is_one_message_without_ack_button():
+    notifier = TelegramNotifier({"bot_token": "t", "acknowledgements": {"enabled": True}})
+    payload = notifier._build_payload(_digest())
+    assert "RINGKASAN PASIEN RAWAT INAP (2)" in payload["text"]
+    assert "Budi" in payload["text"] and "Sari" in payload["text"]
+    # Satu pesan untuk beberapa notifikasi: ack per notifikasi tidak bisa dicatat
+    assert "reply_markup" not in payload
+
+
+def test_whatsapp_and_email_render_every_digest_item():
+    whatsapp = WhatsAppNotifier({"user_code": "u", "secret": "s", "device_id": "d"})
+    text = whatsapp._format_message(_digest())
+    assert "2024/05/01/000001" in text and "2024/05/01/000002" in text
+
+    email = EmailNotifier({"sender": "noreply@example.com"})._build_message(_digest())
+    assert email["Subject"] == "Ringkasan Pasien Rawat Inap (2 pasien)"
+    assert "Sari" in email.get_content()
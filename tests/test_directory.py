@@ -0,0 +1,83 @@
+import pytest
+
+from notifiers import directory
+from notifiers.directory import RecipientDirectory, validate_telegram, validate_whatsapp
+
+
+class FakeQueries:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def get_doctor_contacts(self):
+        return self.rows
+
+
+DOCTORS = [
+    {"kd_dokter": "D01", "nm_dokter": "dr. A", "telegram_id": "123456789", "whatsapp_number": "0812-3456-7890"},
+    {"kd_dokter": "D02", "nm_dokter": "dr. B", "telegram_id": "abc", "whatsapp_number": "021555"},
+]
+
+
+def test_validate_whatsapp_normalizes_and_rejects():
+    assert validate_whatsapp("0812-3456-7890") == ("081234567890", None)
+    assert validate_whatsapp("081234567890") == ("081234567890", None)
+    assert validate_whatsapp(None) == (None, "no WhatsApp number")
+    number, error = validate_whatsapp("021555")
+    assert number is None and "invalid WhatsApp number" in error
+
+
+def test_validate_telegram_accepts_chat_ids_and_usernames():
+    assert validate_telegram(123456789) == ("123456789", None)
+    assert validate_telegram("-1001234567890") == ("-1001234567890", None)
+    assert validate_telegram("@dokter_jaga") == ("@dokter_jaga", None)
+    assert validate_telegram("")[1] == "no Telegram ID"
+    assert validate_telegram("abc")[0] is None
+
+
+def test_clean_uses_directory_entry_and_skips_invalid_contacts():
+    contacts = RecipientDirectory(FakeQueries(DOCTORS))
+    contacts.refresh(force=True)
+
+    good = contacts.clean({**DOCTORS[0], "email": None})
+    assert (good["telegram_id"], good["whatsapp_number"]) == ("123456789", "081234567890")
+    assert good["skipped_contacts"] == {}
+
+    bad = contacts.clean({**DOCTORS[1], "email": None})
+    assert bad["telegram_id"] is None and bad["whatsapp_number"] is None
+    assert set(bad["skipped_contacts"]) == {"telegram", "whatsapp"}
+    assert [entry["kd_dokter"] for entry in contacts.report()] == ["D02"]
+
+
+def test_negative_cache_expires(monkeypatch):
+    clock = {"now": 1000.0}
+    monkeypatch.setattr(directory.time, "monotonic", lambda: clock["now"])
+    contacts = RecipientDirectory(FakeQueries(DOCTORS), {"negative_ttl_seconds": 60})
+    contacts.refresh(force=True)
+
+    contacts.mark_bad("whatsapp", "081234567890", "number not registered")
+    cleaned = contacts.clean(DOCTORS[0])
+    assert cleaned["whatsapp_number"] is None
+    assert cleaned["skipped_contacts"] == {"whatsapp": "number not registered"}
+    assert cleaned["telegram_id"] == "123456789"
+
+    clock["now"] += 61
+    assert contacts.clean(DOCTORS[0])["whatsapp_number"] == "081234567890"
+
+
+def test_whatsapp_permanent_rejection_feeds_negative_cache():
+    pytest.importorskip("requests")
+    from notifiers.whatsapp import WhatsAppNotifier
+
+    contacts = RecipientDirectory(FakeQueries(DOCTORS))
+    notifier = WhatsAppNotifier({"user_code": "u", "secret": "s", "device_id": "d"})
+    notifier.bad_recipient_callback = contacts.mark_bad
+    patient = {**DOCTORS[0], "whatsapp_number": "081234567890", "nm_pasien": "X"}
+
+    assert not notifier._check_response(patient, 500, "gateway timeout")
+    assert not notifier._check_response(patient, 401, '{"message": "invalid number"}')
+    assert contacts.clean(DOCTORS[0])["whatsapp_number"] == "081234567890"
+
+    assert not notifier._check_response(
+        patient, 200, '{"success": false, "message": "Number not registered on WhatsApp"}'
+    )
+    assert contacts.clean(DOCTORS[0])["whatsapp_number"] is None
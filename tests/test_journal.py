@@ -0,0 +1,84 @@
+import json
+
+from utils.journal import SendJournal
+
+
+def _lines(path):
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def test_every_record_reaches_the_file_before_fsync(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    journal = SendJournal(path, fsync_every=100)
+    journal.record_attempt(1)
+    journal.record_outcome(1, "sent")
+    # Belum fsync, tapi baris sudah diserahkan ke OS
+    assert [e["event"] for e in _lines(path)] == ["attempt", "outcome"]
+    journal.close()
+
+
+def test_uncommitted_outcomes_replay_after_reopen(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    journal = SendJournal(path)
+    journal.record_attempt(1)
+    journal.record_outcome(1, "sent")
+    journal.record_attempt(2)
+    journal.record_outcome(2, "failed", "telegram send failed")
+    journal.record_committed([1])
+    journal.close()
+
+    reopened = SendJournal(path)
+    assert reopened.pending_outcomes() == [(2, "failed", "telegram send failed")]
+    assert not reopened.has_outcome(1)
+    reopened.close()
+
+
+def test_attempt_without_outcome_is_not_replayed(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    journal = SendJournal(path)
+    journal.record_attempt(7)
+    journal.close()
+
+    reopened = SendJournal(path)
+    assert reopened.pending_outcomes() == []
+    assert reopened._attempts == {7}
+    reopened.close()
+
+
+def test_truncated_last_line_is_skipped(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    journal = SendJournal(path)
+    journal.record_outcome(3, "sent")
+    journal.close()
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"id": 4, "event": "outc')
+
+    reopened = SendJournal(path)
+    assert reopened.pending_outcomes() == [(3, "sent", None)]
+    reopened.record_outcome(5, "scheduled")
+    reopened.close()
+
+    # Record setelah baris rusak tidak boleh hilang
+    again = SendJournal(path)
+    assert sorted(again.pending_outcomes()) == [(3, "sent", None), (5, "scheduled", None)]
+    again.close()
+
+
+def test_compact_keeps_only_uncommitted_outcomes(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    journal = SendJournal(path)
+    for notif_id in (1, 2, 3):
+        journal.record_attempt(notif_id)
+        journal.record_outcome(notif_id, "sent")
+    journal.record_attempt(4)
+    journal.record_committed([1, 3])
+    journal.compact()
+
+    entries = _lines(path)
+    assert [(e["id"], e["event"]) for e in entries] == [(2, "outcome")]
+    journal.record_outcome(5, "failed", "x")
+    journal.close()
+
+    reopened = SendJournal(path)
+    assert sorted(reopened.pending_outcomes()) == [(2, "sent", None), (5, "failed", "x")]
+    reopened.close()
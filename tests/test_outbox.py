@@ -0,0 +1,67 @@
+from database.outbox import StatusOutbox
+from utils.journal import SendJournal
+
+
+def _row(notif_id):
+    return ({"notification_id": notif_id}, [{"recipient": f"r{notif_id}"}])
+
+
+class FakeQueries:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.written = []
+
+    def update_notification_statuses(self, updates):
+        if self.fail:
+            return False
+        self.written.extend(tuple(update) for update in updates)
+        return True
+
+
+def test_taken_rows_are_not_resent_after_commit(tmp_path):
+    outbox = StatusOutbox(tmp_path / "outbox.sqlite3")
+    journal = SendJournal(tmp_path / "journal.jsonl")
+    outbox.save_snapshot([_row(1), _row(2), _row(3)])
+
+    # Outage pertama: row 1-2 dikirim dari snapshot, outcome lalu ter-commit
+    batch = outbox.take_snapshot(2, journal.has_outcome)
+    assert [notif["notification_id"] for notif, _ in batch] == [1, 2]
+    for notif, _ in batch:
+        journal.record_outcome(notif["notification_id"], "sent")
+    journal.record_committed([1, 2])
+    journal.compact()
+
+    # Outage berikutnya: hanya row yang belum pernah dikirim
+    batch = outbox.take_snapshot(10, journal.has_outcome)
+    assert [notif["notification_id"] for notif, _ in batch] == [3]
+    assert outbox.take_snapshot(10, journal.has_outcome) == []
+    journal.close()
+    outbox.close()
+
+
+def test_rows_with_outcome_are_dropped_from_snapshot(tmp_path):
+    outbox = StatusOutbox(tmp_path / "outbox.sqlite3")
+    outcomes = {1}
+    outbox.save_snapshot([_row(1), _row(2)])
+
+    assert [n["notification_id"] for n, _ in outbox.take_snapshot(10, outcomes.__contains__)] == [2]
+    # Row 1 sudah dibuang: setelah commit pun tidak muncul lagi
+    outcomes.clear()
+    assert outbox.load_snapshot() == []
+    outbox.close()
+
+
+def test_drain_writes_in_seq_order_and_keeps_rows_while_down(tmp_path):
+    outbox = StatusOutbox(tmp_path / "outbox.sqlite3")
+    outbox.enqueue([(1, "failed", "timeout"), (2, "sent", None)])
+    outbox.enqueue([(1, "sent", None)])
+
+    assert not outbox.drain(FakeQueries(fail=True))
+    assert outbox.size() == 3
+
+    queries = FakeQueries()
+    assert outbox.drain(queries, chunk_size=2)
+    # Update terakhir untuk notifikasi yang sama menang
+    assert queries.written == [(1, "failed", "timeout"), (2, "sent", None), (1, "sent", None)]
+    assert outbox.size() == 0
+    outbox.close()
@@ -0,0 +1,24 @@
+import sqlite3
+
+from database.queries import CURRENT_KAMAR_INAP_JOIN
+
+
+def test_room_transfer_joins_only_latest_kamar_inap_row():
+    conn = sqlite3.connect(":memory:")
+    conn.executescript(
+        """
+        CREATE TABLE notification_queue (id INTEGER, no_rawat TEXT);
+        CREATE TABLE kamar_inap (no_rawat TEXT, kd_kamar TEXT, tgl_masuk TEXT);
+        INSERT INTO notification_queue VALUES (1, 'R1'), (2, 'R2');
+        INSERT INTO kamar_inap VALUES
+            ('R1', 'K1', '2026-01-01 10:00'),
+            ('R1', 'K2', '2026-01-02 10:00'),
+            ('R1', 'K1', '2026-01-03 10:00'),
+            ('R2', 'K5', '2026-01-01 08:00');
+        """
+    )
+    rows = conn.execute(
+        f"SELECT nq.id, ki.kd_kamar, ki.tgl_masuk FROM notification_queue nq {CURRENT_KAMAR_INAP_JOIN}"
+        " ORDER BY nq.id"
+    ).fetchall()
+    assert rows == [(1, "K1", "2026-01-03 10:00"), (2, "K5", "2026-01-01 08:00")]
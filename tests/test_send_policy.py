@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta
+
+from utils.send_policy import SendPolicy, recipient_key
+
+QUIET = {"quiet_hours": {
+    "enabled": True,
+    "start": "22:00",
+    "end": "06:00",
+    "urgent_types": ["dpjp_changed"],
+    "doctors": {"D02": {"start": "12:00", "end": "13:00"}},
+}}
+
+
+def test_quiet_hours_wrap_past_midnight():
+    policy = SendPolicy(QUIET)
+    message = {"kd_dokter": "D01", "notification_type": "new_patient_dpjp"}
+    assert policy.quiet_until(message, datetime(2026, 1, 1, 23, 30)) == datetime(2026, 1, 2, 6, 0)
+    assert policy.quiet_until(message, datetime(2026, 1, 2, 2, 0)) == datetime(2026, 1, 2, 6, 0)
+    assert policy.quiet_until(message, datetime(2026, 1, 2, 6, 0)) is None
+
+
+def test_urgent_types_and_doctor_override():
+    policy = SendPolicy(QUIET)
+    urgent = {"kd_dokter": "D01", "notification_type": "dpjp_changed"}
+    assert policy.quiet_until(urgent, datetime(2026, 1, 1, 23, 30)) is None
+    lunch = {"kd_dokter": "D02", "notification_type": "new_patient_dpjp"}
+    assert policy.quiet_until(lunch, datetime(2026, 1, 1, 23, 30)) is None
+    assert policy.quiet_until(lunch, datetime(2026, 1, 1, 12, 30)) == datetime(2026, 1, 1, 13, 0)
+
+
+def test_digest_slot_is_stable_per_recipient():
+    policy = SendPolicy({"digest": {
+        "enabled": True, "types": ["new_patient_dpjp"], "interval_minutes": 60, "stagger_seconds": 300,
+    }})
+    message = {"kd_dokter": "D01", "notification_type": "new_patient_dpjp"}
+    first = policy.digest_due(message, datetime(2026, 1, 1, 10, 5))
+    second = policy.digest_due(message, datetime(2026, 1, 1, 10, 50))
+    assert first == second
+    assert datetime(2026, 1, 1, 11, 0) <= first < datetime(2026, 1, 1, 11, 5)
+    assert policy.digest_due({**message, "notification_type": "dpjp_changed"}, datetime.now()) is None
+
+
+def test_reminder_schedule_and_limit():
+    policy = SendPolicy({"reminder": {"enabled": True, "after_minutes": 30, "max_reminders": 2}})
+    message = {"kd_dokter": "D01", "notification_type": "new_patient_dpjp"}
+    sent_at = datetime(2026, 1, 1, 10, 0)
+    assert policy.reminder_due(message, sent_at, 1) == sent_at + timedelta(minutes=30)
+    assert policy.reminder_due(message, sent_at, 3) is None
+    assert SendPolicy({}).reminder_due(message, sent_at, 1) is None
+
+
+def test_recipient_key_falls_back_to_contacts():
+    assert recipient_key({"kd_dokter": "D01"}) == "dokter:D01"
+    assert recipient_key({"telegram_id": "123", "email": "a@b"}) == "kontak:123||a@b"
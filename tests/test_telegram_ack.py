@@ -0,0 +1,180 @@
+import importlib.util
+import json
+import os
+import threading
+import urllib.request
+from datetime import datetime
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("requests")
+
+from notifiers.telegram import TelegramNotifier
+from notifiers.telegram_ack import TelegramAckConsumer, TelegramMessageLog
+
+STUB_PATH = os.path.join(os.path.dirname(__file__), "..", "scripts", "telegram_stub_server.py")
+
+
+class FakeQueries:
+    """notification_telegram_message + acknowledged_at di memori"""
+
+    def __init__(self):
+        self.messages = {}
+        self.acks = {}
+        self.fail_ack = False
+        self.fail_record = False
+
+    def record_telegram_messages(self, rows):
+        if self.fail_record:
+            return False
+        for chat_id, message_id, notification_id, _ in rows:
+            self.messages[(chat_id, message_id)] = notification_id
+        return True
+
+    def get_notifications_by_telegram_message(self, pairs):
+        return {pair: self.messages[pair] for pair in pairs if pair in self.messages}
+
+    def acknowledge_notifications(self, acks):
+        if self.fail_ack:
+            return False
+        for nid, acked_at, actor in acks:
+            self.acks.setdefault(nid, actor)
+        return True
+
+
+def _consumer(queries, message_log=None, **config):
+    notifier = TelegramNotifier({"bot_token": "t", "api_base": "http://127.0.0.1:9"})
+    consumer = TelegramAckConsumer(
+        notifier, queries, message_log,
+        {"unresolved_backoff_seconds": 0, **config},
+    )
+    consumer._answered = []
+    consumer._answer_callbacks = consumer._answered.extend
+    return consumer
+
+
+def _callback(update_id, data, chat_id=123, message_id=1):
+    return {"update_id": update_id, "callback_query": {
+        "id": f"cb{update_id}",
+        "from": {"id": chat_id, "username": "dokter"},
+        "data": data,
+        "message": {"message_id": message_id, "chat": {"id": chat_id}},
+    }}
+
+
+def _reply(update_id, message_id, chat_id=123):
+    return {"update_id": update_id, "message": {
+        "message_id": 100 + update_id,
+        "chat": {"id": chat_id},
+        "from": {"id": chat_id, "username": "dokter"},
+        "date": int(datetime.now().timestamp()),
+        "reply_to_message": {"message_id": message_id},
+    }}
+
+
+def test_collect_acks_validates_callback_against_sent_message():
+    queries = FakeQueries()
+    queries.messages[("123", 1)] = 42
+    consumer = _consumer(queries)
+    no_message = _callback(3, "ack:42")
+    del no_message["callback_query"]["message"]
+
+    acks, callbacks, unresolved = consumer._collect_acks([
+        _callback(1, "ack:42"), _callback(2, "ack:43"), no_message, _reply(4, 1),
+    ])
+    assert [a[0] for a in acks] == [42]
+    assert [cid for _, cid in callbacks] == ["cb1", "cb2", "cb3"]
+    assert unresolved == set()
+
+
+def test_flush_failure_keeps_offset():
+    queries = FakeQueries()
+    log = TelegramMessageLog(queries)
+    log.record({"notification_id": 42}, 123, 1)
+    queries.fail_record = True
+    consumer = _consumer(queries, log)
+    consumer._get_updates = lambda: [_callback(1, "ack:42")]
+
+    assert consumer.poll_once() == 0
+    assert consumer.offset is None
+    queries.fail_record = False
+    assert consumer.poll_once() == 1
+    assert consumer.offset == 2
+    assert consumer._answered == ["cb1"]
+
+
+def test_failed_ack_write_keeps_offset():
+    queries = FakeQueries()
+    queries.messages[("123", 1)] = 42
+    queries.fail_ack = True
+    consumer = _consumer(queries)
+    consumer._get_updates = lambda: [_callback(5, "ack:42")]
+    assert consumer.poll_once() == 0
+    assert consumer.offset is None
+
+
+def test_unknown_message_is_retried_until_recorded():
+    queries = FakeQueries()
+    queries.messages[("123", 1)] = 41
+    consumer = _consumer(queries)
+    consumer._get_updates = lambda: [_reply(7, 1), _callback(8, "ack:42", message_id=2)]
+
+    # message_id 2 ditulis shard lain di akhir tick-nya
+    assert consumer.poll_once() == 1
+    assert consumer.offset == 8
+    assert consumer._answered == []
+    queries.messages[("123", 2)] = 42
+    assert consumer.poll_once() == 2
+    assert consumer.offset == 9
+    assert queries.acks == {41: "dokter", 42: "dokter"}
+    assert consumer._answered == ["cb8"]
+
+
+def test_unknown_message_is_dropped_after_retry_window():
+    queries = FakeQueries()
+    consumer = _consumer(queries, unresolved_retry_seconds=0)
+    consumer._get_updates = lambda: [_callback(3, "ack:42", message_id=9)]
+    assert consumer.poll_once() == 0
+    assert consumer.offset == 4
+
+
+@pytest.fixture
+def stub_server():
+    spec = importlib.util.spec_from_file_location("telegram_stub_server", STUB_PATH)
+    stub = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(stub)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), stub.make_handler(stub.StubState()))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+def _stub_post(base, path, body):
+    request = urllib.request.Request(
+        f"{base}/{path}", data=json.dumps(body).encode(), headers={"Content-Type": "application/json"}
+    )
+    return json.load(urllib.request.urlopen(request))
+
+
+def test_button_ack_round_trip_against_stub(stub_server):
+    queries = FakeQueries()
+    log = TelegramMessageLog(queries)
+    notifier = TelegramNotifier({
+        "bot_token": "t", "api_base": stub_server, "acknowledgements": {"enabled": True},
+    })
+    notifier.sent_message_callback = log.record
+    patient = {
+        "notification_id": 42, "telegram_id": "123", "nm_dokter": "dr. A", "nm_pasien": "X",
+        "jenis_kelamin": "Laki-laki", "no_rawat": "R1", "no_rkm_medis": "M1", "kd_kamar": "K1",
+        "nm_bangsal": "Melati", "kd_bangsal": "MLT", "tgl_masuk": datetime(2026, 1, 1, 10, 0),
+        "diagnosa_awal": "-",
+    }
+    assert notifier.send_patient_notification(patient)
+
+    _stub_post(stub_server, "_ack", {"chat_id": 123, "message_id": 1})
+    consumer = TelegramAckConsumer(notifier, queries, log, {"poll_timeout": 0})
+    assert consumer.poll_once() == 1
+    assert queries.acks == {42: "dokter"}
+    assert consumer.poll_once() == 0
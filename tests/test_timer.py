@@ -0,0 +1,115 @@
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+
+from utils.timer import TimerScheduler
+
+
+class FakeStore:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.jobs = {}
+        self.done = []
+
+    def add(self, kind, due_at, payload, dedupe_key):
+        if self.fail:
+            return None
+        job_id = len(self.jobs) + 1
+        self.jobs[job_id] = {
+            "id": job_id, "kind": kind, "due_at": due_at,
+            "payload": payload, "dedupe_key": dedupe_key,
+        }
+        return job_id
+
+    def load_pending(self):
+        return [job for job_id, job in self.jobs.items() if job_id not in self.done]
+
+    def mark_done(self, ids):
+        self.done.extend(ids)
+
+
+def test_due_jobs_run_in_order_and_future_jobs_wait():
+    scheduler = TimerScheduler()
+    ran = []
+    scheduler.register("deliver", lambda payload: ran.append(payload["n"]))
+    now = datetime.now()
+    scheduler.schedule_at(now - timedelta(seconds=1), "deliver", {"n": 2})
+    scheduler.schedule_at(now - timedelta(seconds=5), "deliver", {"n": 1})
+    scheduler.schedule_at(now + timedelta(hours=1), "deliver", {"n": 3})
+
+    assert scheduler.run_pending() == 2
+    assert ran == [1, 2]
+    assert len(scheduler) == 1
+    assert 3500 < scheduler.next_delay() <= 3600
+
+
+def test_failed_handler_is_retried_later():
+    scheduler = TimerScheduler(retry_seconds=60)
+    scheduler.register("reminder", lambda payload: 1 / 0)
+    scheduler.schedule_at(datetime.now() - timedelta(seconds=1), "reminder", {})
+
+    assert scheduler.run_pending() == 1
+    assert len(scheduler) == 1
+    assert scheduler.next_delay() > 50
+
+
+def test_recurring_job_rereads_interval():
+    scheduler = TimerScheduler()
+    calls = []
+    interval = {"seconds": 10}
+    scheduler.every(lambda: interval["seconds"], lambda: calls.append(1))
+    scheduler.run_pending()
+    assert calls == [1]
+    assert 9 < scheduler.next_delay() <= 10
+
+
+def test_dedupe_key_and_cancel():
+    scheduler = TimerScheduler()
+    job = scheduler.schedule_at(datetime.now() + timedelta(minutes=5), "deliver", {"items": [1]}, "digest:a")
+    assert scheduler.pending_job("digest:a") is job
+    assert scheduler.update_payload(job, {"items": [1, 2]})
+    assert scheduler.pending_job("digest:a").payload == {"items": [1, 2]}
+    scheduler.cancel(job)
+    assert scheduler.pending_job("digest:a") is None
+    assert len(scheduler) == 0
+
+
+def test_persisted_jobs_survive_restart():
+    store = FakeStore()
+    TimerScheduler(store).schedule_at(datetime.now() - timedelta(seconds=1), "deliver", {"n": 1})
+
+    restarted = TimerScheduler(store)
+    ran = []
+    restarted.register("deliver", lambda payload: ran.append(payload["n"]))
+    assert restarted.load() == 1
+    restarted.run_pending()
+    assert ran == [1]
+    assert store.done == [1]
+
+
+def test_store_failure_returns_none():
+    scheduler = TimerScheduler(FakeStore(fail=True))
+    assert scheduler.schedule_at(datetime.now(), "deliver", {}) is None
+    assert len(scheduler) == 0
+
+
+def test_job_returning_future_is_marked_done_when_future_completes():
+    store = FakeStore()
+    scheduler = TimerScheduler(store)
+    pending = Future()
+    scheduler.register("deliver", lambda payload: pending)
+    scheduler.schedule_at(datetime.now() - timedelta(seconds=1), "deliver", {"n": 1})
+
+    assert scheduler.run_pending() == 1
+    assert store.done == []
+    pending.set_result(None)
+    assert store.done == [1]
+
+
+def test_call_soon_runs_once():
+    scheduler = TimerScheduler()
+    ran = []
+    scheduler.call_soon(lambda: ran.append(1))
+    scheduler.run_pending()
+    scheduler.run_pending()
+    assert ran == [1]
+    assert len(scheduler) == 0